@@ -1,4 +1,5 @@
 from .emotion_analyzer import EmotionAnalyzer
 from .urgency_analyzer import UrgencyAnalyzer
+from .unified_analyzer import UnifiedAnalyzer
 
-__all__ = ['EmotionAnalyzer', 'UrgencyAnalyzer']
+__all__ = ['EmotionAnalyzer', 'UrgencyAnalyzer', 'UnifiedAnalyzer']
@@ -1,60 +1,72 @@
-import json
-import os
+import logging
+from typing import Optional
+
+import ahocorasick
+
+from .rules import clean_text, load_rules_file
+
+logger = logging.getLogger(__name__)
+
+# Emotion categories in priority order: earlier categories win when a keyword
+# is listed more than once.
+EMOTION_PRIORITY = ('negative', 'positive', 'neutral')
+
+# Emotions that are reported when matched; neutral words never override them.
+EXPLICIT_EMOTIONS = ('negative', 'positive')
 
 class EmotionAnalyzer:
     def __init__(self):
         self.rules = self._load_rules()
-        
+        # Single-word keywords match whole words, so they are looked up in a set;
+        # multi-word keywords match as phrases via the automaton.
+        self._single = {
+            emotion: frozenset(kw for kw in self.rules.get(emotion, []) if ' ' not in kw)
+            for emotion in EMOTION_PRIORITY
+        }
+        self._automaton = self._build_automaton(self.rules)
+
     def _load_rules(self):
-        """Load emotion rules from the JSON file"""
-        rules_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 
-                                'rules', 'emotion_urgency_rules.json')
-        with open(rules_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data['emotion_rules']
-    
+        """Load emotion rules from the shared (cached) rules file, lowercased"""
+        return {
+            emotion: [keyword.lower() for keyword in keywords]
+            for emotion, keywords in load_rules_file()['emotion_rules'].items()
+        }
+
+    @staticmethod
+    def _build_automaton(rules) -> Optional[ahocorasick.Automaton]:
+        """
+        Compile the multi-word emotion keywords into a single Aho-Corasick
+        automaton. Returns None when there are no multi-word keywords.
+        """
+        automaton = ahocorasick.Automaton()
+        for emotion in EMOTION_PRIORITY:
+            for keyword in rules.get(emotion, []):
+                if ' ' in keyword and keyword not in automaton:
+                    automaton.add_word(keyword, (emotion, keyword))
+        if len(automaton) == 0:
+            return None
+        automaton.make_automaton()
+        return automaton
+
     def analyze_emotion(self, text: str) -> str:
         """
         Analyze the emotion of the input text.
         Returns: 'positive', 'negative', or 'neutral'
         Priority: If explicit emotions (positive/negative) exist, ignore neutral words.
         """
-        # Clean and prepare text
-        text = text.lower()
-        # Remove punctuation from text for word matching
-        import string
-        cleaned_text = text.translate(str.maketrans('', '', string.punctuation))
-        words = cleaned_text.split()
-        
-        print(f"Analyzing text: {text}")
-        print(f"Cleaned text: {cleaned_text}")
-        print(f"Words: {words}")
-        print(f"Negative keywords: {self.rules['negative']}")
-        
-        # First check for explicit emotions (positive/negative)
-        negative_matches = [keyword for keyword in self.rules['negative'] 
-                          if keyword.lower() in words or 
-                          (' ' in keyword and keyword.lower() in cleaned_text)]
-        
-        positive_matches = [keyword for keyword in self.rules['positive']
-                          if keyword.lower() in words or 
-                          (' ' in keyword and keyword.lower() in cleaned_text)]
-        
-        print(f"Negative matches found: {negative_matches}")
-        print(f"Positive matches found: {positive_matches}")
-        
-        # If we have explicit emotions, return them (negative takes priority if both exist)
-        if negative_matches:
-            print("Returning negative due to matches:", negative_matches)
-            return 'negative'
-        if positive_matches:
-            print("Returning positive due to matches:", positive_matches)
-            return 'positive'
-            
-        # Only check neutral words if no explicit emotions were found
-        neutral_matches = [keyword for keyword in self.rules['neutral']
-                         if keyword.lower() in words or 
-                         (' ' in keyword and keyword.lower() in cleaned_text)]
-        
-        print(f"Neutral matches found: {neutral_matches}")
+        # Lowercase and remove punctuation from text for word matching
+        cleaned_text = clean_text(text)
+        words = set(cleaned_text.split())
+
+        phrase_hits = set()
+        if self._automaton is not None:
+            phrase_hits = {emotion for _, (emotion, _) in self._automaton.iter(cleaned_text)}
+
+        # Negative takes priority over positive if both exist
+        for emotion in EXPLICIT_EMOTIONS:
+            if emotion in phrase_hits or not self._single[emotion].isdisjoint(words):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Emotion %s matched: %s", emotion, sorted(self._single[emotion] & words))
+                return emotion
+
         return 'neutral'
@@ -0,0 +1,74 @@
+import logging
+from typing import Tuple
+
+import ahocorasick
+
+from .emotion_analyzer import EXPLICIT_EMOTIONS
+from .rules import clean_text, load_rules_file
+from .urgency_analyzer import URGENCY_PRIORITY
+
+logger = logging.getLogger(__name__)
+
+class UnifiedAnalyzer:
+    """
+    Emotion and urgency analysis in a single pass over the text.
+    Gives the same labels as EmotionAnalyzer and UrgencyAnalyzer.
+    """
+    def __init__(self):
+        rules = load_rules_file()
+        self._automaton = self._build_automaton(rules['emotion_rules'], rules['urgency_rules'])
+
+    @staticmethod
+    def _build_automaton(emotion_rules, urgency_rules) -> ahocorasick.Automaton:
+        """
+        Compile emotion keywords and urgency phrases into one Aho-Corasick
+        automaton. Each pattern maps to the ('emotion' | 'urgency', rank) tags
+        it stands for; single-word emotion keywords are space-padded so they
+        only match whole words. Neutral keywords and low-urgency phrases are
+        skipped since they are the defaults and never change the result.
+        """
+        patterns = {}
+        for rank, emotion in enumerate(EXPLICIT_EMOTIONS):
+            for keyword in emotion_rules.get(emotion, []):
+                keyword = keyword.lower()
+                pattern = keyword if ' ' in keyword else f" {keyword} "
+                patterns.setdefault(pattern, set()).add(('emotion', rank))
+        for rank, level in enumerate(URGENCY_PRIORITY[:-1]):
+            for phrase in urgency_rules.get(level, []):
+                patterns.setdefault(phrase.lower(), set()).add(('urgency', rank))
+
+        automaton = ahocorasick.Automaton()
+        for pattern, tags in patterns.items():
+            automaton.add_word(pattern, tuple(tags))
+        automaton.make_automaton()
+        return automaton
+
+    def analyze(self, text: str) -> Tuple[str, str]:
+        """
+        Analyze emotion and urgency of the input text with one scan.
+        Returns: (emotion, urgency), e.g. ('negative', 'high')
+        Priority: negative > positive > neutral; high > medium > low.
+        """
+        # clean_text collapses whitespace, so padded single-word keywords line up
+        haystack = f" {clean_text(text)} "
+
+        emotion_rank = len(EXPLICIT_EMOTIONS)     # neutral
+        urgency_rank = len(URGENCY_PRIORITY) - 1  # low
+        for _, tags in self._automaton.iter(haystack):
+            for kind, rank in tags:
+                if kind == 'emotion':
+                    emotion_rank = min(emotion_rank, rank)
+                else:
+                    urgency_rank = min(urgency_rank, rank)
+            if emotion_rank == 0 and urgency_rank == 0:
+                break
+
+        emotion = EXPLICIT_EMOTIONS[emotion_rank] if emotion_rank < len(EXPLICIT_EMOTIONS) else 'neutral'
+        urgency = URGENCY_PRIORITY[urgency_rank]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Analyzed text - emotion: %s, urgency: %s", emotion, urgency)
+        return emotion, urgency
+
+
+# Global instance
+unified_analyzer = UnifiedAnalyzer()
@@ -1,54 +1,57 @@
-import json
-import os
+import logging
+
+import ahocorasick
+
+from .rules import clean_text, load_rules_file
+
+logger = logging.getLogger(__name__)
+
+# Urgency levels in priority order: higher urgency takes precedence.
+URGENCY_PRIORITY = ('high', 'medium', 'low')
 
 class UrgencyAnalyzer:
     def __init__(self):
         self.rules = self._load_rules()
-        
+        self._automaton = self._build_automaton(self.rules)
+
     def _load_rules(self):
-        """Load urgency rules from the JSON file"""
-        rules_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 
-                                'rules', 'emotion_urgency_rules.json')
-        with open(rules_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            return data['urgency_rules']
-    
+        """Load urgency rules from the shared (cached) rules file"""
+        return load_rules_file()['urgency_rules']
+
+    @staticmethod
+    def _build_automaton(rules) -> ahocorasick.Automaton:
+        """
+        Compile the urgency phrases into a single Aho-Corasick automaton.
+        Phrases match as substrings of the cleaned text. Phrases of the
+        default (lowest) level are skipped since they never change the result.
+        """
+        automaton = ahocorasick.Automaton()
+        for rank, level in enumerate(URGENCY_PRIORITY[:-1]):
+            for phrase in rules.get(level, []):
+                phrase = phrase.lower()
+                if phrase not in automaton:
+                    automaton.add_word(phrase, (rank, phrase))
+        automaton.make_automaton()
+        return automaton
+
     def analyze_urgency(self, text: str) -> str:
         """
         Analyze the urgency level of the input text.
         Returns: 'high', 'medium', or 'low'
         Priority: If multiple urgency levels are found, higher urgency takes precedence.
         """
-        # Clean and prepare text
-        text = text.lower()
-        # Remove punctuation from text for better matching
-        import string
-        cleaned_text = text.translate(str.maketrans('', '', string.punctuation))
-        
-        print(f"Analyzing urgency - Original text: {text}")
-        print(f"Analyzing urgency - Cleaned text: {cleaned_text}")
-        
-        # First check for high urgency indicators
-        high_matches = [phrase for phrase in self.rules['high']
-                       if phrase.lower() in cleaned_text]
-        if high_matches:
-            print(f"Found high urgency indicators: {high_matches}")
-            return 'high'
-            
-        # Then check for medium urgency
-        medium_matches = [phrase for phrase in self.rules['medium']
-                         if phrase.lower() in cleaned_text]
-        if medium_matches:
-            print(f"Found medium urgency indicators: {medium_matches}")
-            return 'medium'
-            
-        # Finally check for low urgency
-        low_matches = [phrase for phrase in self.rules['low']
-                      if phrase.lower() in cleaned_text]
-        if low_matches:
-            print(f"Found low urgency indicators: {low_matches}")
-            return 'low'
-            
-        # If no urgency indicators are found, return low
-        print("No urgency indicators found, defaulting to low")
-        return 'low'
+        # Lowercase and remove punctuation from text for better matching
+        cleaned_text = clean_text(text)
+
+        # Single linear scan over the cleaned text, keeping the highest level seen.
+        # If no urgency indicators are found, default to low.
+        best_rank = len(URGENCY_PRIORITY) - 1
+        for _, (rank, phrase) in self._automaton.iter(cleaned_text):
+            if rank < best_rank:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Found %s urgency indicator: %s", URGENCY_PRIORITY[rank], phrase)
+                best_rank = rank
+                if rank == 0:
+                    break
+
+        return URGENCY_PRIORITY[best_rank]
@@ -6,7 +6,8 @@ import logging
 from datetime import datetime
 from typing import Dict, Any
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
 
 from app.api.models import (
     ChatRequest, ChatResponse, ErrorResponse, FeedbackRequest, FeedbackResponse,
@@ -15,7 +16,9 @@ from app.api.models import (
 from app.nlp.intent_classifier import IntentClassifier
 from app.policy.response_policy import ResponsePolicy
 from app.state.session_manager import session_manager
-from analyzers import EmotionAnalyzer, UrgencyAnalyzer
+from app.database import models
+from app.database.base import get_db
+from analyzers.unified_analyzer import unified_analyzer
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -24,20 +27,64 @@ logger = logging.getLogger(__name__)
 # Initialize components
 intent_classifier = IntentClassifier()
 response_policy = ResponsePolicy()
-emotion_analyzer = EmotionAnalyzer()
-urgency_analyzer = UrgencyAnalyzer()
+
+# Reply for whitespace-only input
+EMPTY_INPUT_REPLY = "I'd be happy to help! Please let me know what you'd like to know about."
+
+# Static error payloads (same shape as ErrorResponse), built once at import
+_ERR_PROCESSING = {
+    "error_code": "PROCESSING_ERROR",
+    "message": "I'm having trouble processing your request right now. Please try again in a moment.",
+    "details": None
+}
+_ERR_DB = {
+    "error_code": "DB_ERROR",
+    "message": "Unable to save feedback",
+    "details": None
+}
+_ERR_FEEDBACK = {
+    "error_code": "FEEDBACK_ERROR",
+    "message": "An error occurred while saving your feedback",
+    "details": None
+}
+_ERR_SESSION_ALREADY_ENDED = {
+    "error_code": "SESSION_NOT_FOUND",
+    "message": "Session not found or already ended",
+    "details": None
+}
+_ERR_SESSION_END = {
+    "error_code": "SESSION_END_ERROR",
+    "message": "An error occurred while ending the session",
+    "details": None
+}
+_ERR_SESSION_NOT_FOUND = {
+    "error_code": "SESSION_NOT_FOUND",
+    "message": "Session not found",
+    "details": None
+}
+_ERR_TRANSFER = {
+    "error_code": "TRANSFER_ERROR",
+    "message": "An error occurred while requesting human assistance",
+    "details": None
+}
+_ERR_SESSION_EXPIRED = {
+    "error_code": "SESSION_NOT_FOUND",
+    "message": "Session not found or expired",
+    "details": None
+}
+_ERR_STATS = {
+    "error_code": "STATS_ERROR",
+    "message": "Unable to retrieve session statistics at this time.",
+    "details": None
+}
 
 # Create router
 router = APIRouter(
     tags=["chat"],
     responses={404: {"model": ErrorResponse}},  # 添加通用错误响应
-    default_response_class=JSONResponse  # 设置默认响应类型
+    default_response_class=ORJSONResponse  # 设置默认响应类型（orjson序列化）
 )
 
-def clamp_confidence(confidence: float) -> float:
-    """限制置信度在0.0-1.0范围内"""
-    return max(0.0, min(1.0, float(confidence)))
-
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest) -> ChatResponse:
     """
@@ -46,16 +93,16 @@ async def chat(request: ChatRequest) -> ChatResponse:
     Integrates intent classification, session management, and response generation.
     """
     try:
-        # 额外检查：处理纯空白字符的情况
+        # 额外检查：处理纯空白字符的情况（不创建会话，直接返回）
         if not request.user_text.strip():
-            return ChatResponse(
-                session_id=session_manager.create_session(request.session_id),
-                reply_text="I'd be happy to help! Please let me know what you'd like to know about.",
+            return ChatResponse.model_construct(
+                session_id=request.session_id or "",
+                reply_text=EMPTY_INPUT_REPLY,
                 intent="casual",
                 confidence=1.0,
                 slots={"category": "empty_input"},
                 need_human=False,
-                turn_count=1
+                turn_count=0
             )
         
         # Create or get session
@@ -68,59 +115,29 @@ async def chat(request: ChatRequest) -> ChatResponse:
         # Get response using response policy
         response_data = response_policy.get_response(request.user_text)
         
-        # 确保置信度在合理范围内
-        confidence = clamp_confidence(response_data["confidence"])
+        # 确保置信度在0.0-1.0范围内
+        confidence = response_data["confidence"]
+        confidence = 0.0 if confidence < 0.0 else 1.0 if confidence > 1.0 else confidence
         
         # 判断是否需要人工介入
         need_human = response_data.get("need_human", False)
         
-        # Update session with this conversation turn
+        # Analyze emotion and urgency in a single pass; stored with the turn itself
+        emotion, urgency = unified_analyzer.analyze(request.user_text)
+        logger.info(f"Analyzing - Emotion: {emotion}, Urgency: {urgency}, Text: {request.user_text}")
+        
+        # Update session with this conversation turn (batch-written in the background)
         session_manager.update_session(
             session_id=session_id,
             user_input=request.user_text,
             intent=response_data["source"],  # 使用source作为intent
             confidence=confidence,
             bot_response=response_data["response"],
-            slots=response_data.get("metadata", {})
+            slots=response_data.get("metadata", {}),
+            emotion=emotion,
+            urgency=urgency
         )
         
-        try:
-            # Analyze emotion and urgency
-            emotion = emotion_analyzer.analyze_emotion(request.user_text)
-            urgency = urgency_analyzer.analyze_urgency(request.user_text)
-            
-            # Get database connection
-            from sqlalchemy.orm import Session
-            from app.database.base import get_db
-            
-            # Update the conversation turn with emotion and urgency
-            db: Session = next(get_db())
-            from sqlalchemy import text
-            
-            # Print the values for debugging
-            logger.info(f"Analyzing - Emotion: {emotion}, Urgency: {urgency}, Text: {request.user_text}")
-            
-            update_stmt = text("""
-                UPDATE conversation_turns 
-                SET emotion = :emotion, urgency = :urgency 
-                WHERE session_id = :session_id 
-                AND turn_number = :turn_number
-            """)
-            
-            db.execute(
-                update_stmt,
-                {
-                    "emotion": emotion,
-                    "urgency": urgency,
-                    "session_id": session_id,
-                    "turn_number": current_turn
-                }
-            )
-            db.commit()
-        except Exception as e:
-            # Log the error but don't affect the main flow
-            logger.error(f"Error updating emotion/urgency: {str(e)}")
-        
         # Log conversation
         logger.info(
             f"Chat - Session: {session_id[:8]}... | "
@@ -129,7 +146,7 @@ async def chat(request: ChatRequest) -> ChatResponse:
             f"User: {request.user_text[:50]}..."
         )
         
-        return ChatResponse(
+        return ChatResponse.model_construct(
             session_id=session_id,
             reply_text=response_data["response"],
             intent=response_data["source"],
@@ -143,25 +160,13 @@ async def chat(request: ChatRequest) -> ChatResponse:
         logger.error(f"Error processing chat request: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                error_code="PROCESSING_ERROR",
-                message="I'm having trouble processing your request right now. Please try again in a moment.",
-                details={"error": str(e)}
-            ).dict()
+            detail={**_ERR_PROCESSING, "details": {"error": str(e)}}
         )
 
 @router.post("/save-feedback", response_model=FeedbackResponse)
-async def save_feedback(request: FeedbackRequest) -> FeedbackResponse:
+async def save_feedback(request: FeedbackRequest, db: Session = Depends(get_db)) -> FeedbackResponse:
     """直接保存反馈到数据库"""
     try:
-        from sqlalchemy.orm import Session
-        from app.database.base import get_db
-        from app.database import models
-        from datetime import datetime
-
-        # 获取数据库连接
-        db: Session = next(get_db())
-        
         try:
             # 直接创建反馈记录
             db_feedback = models.UserFeedback(
@@ -174,7 +179,7 @@ async def save_feedback(request: FeedbackRequest) -> FeedbackResponse:
             db.refresh(db_feedback)
             
             logger.info(f"Feedback saved directly for session {request.session_id[:8]}... - Type: {request.feedback_type}")
-            return FeedbackResponse(
+            return FeedbackResponse.model_construct(
                 success=True,
                 message="Thank you for your feedback!"
             )
@@ -184,20 +189,14 @@ async def save_feedback(request: FeedbackRequest) -> FeedbackResponse:
             logger.error(f"Database error saving feedback: {str(e)}")
             raise HTTPException(
                 status_code=500,
-                detail=ErrorResponse(
-                    error_code="DB_ERROR",
-                    message="Unable to save feedback"
-                ).dict()
+                detail=_ERR_DB
             )
             
     except Exception as e:
         logger.error(f"Error in save_feedback: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                error_code="FEEDBACK_ERROR",
-                message="An error occurred while saving your feedback"
-            ).dict()
+            detail=_ERR_FEEDBACK
         )
 
 @router.post("/session/end", response_model=SessionEndResponse)
@@ -214,17 +213,14 @@ async def end_session(request: SessionEndRequest) -> SessionEndResponse:
         
         if success:
             logger.info(f"Session {request.session_id[:8]}... ended - Reason: {request.end_reason}")
-            return SessionEndResponse(
+            return SessionEndResponse.model_construct(
                 success=True,
                 message="Session ended successfully. Thank you for using our service!"
             )
         else:
             raise HTTPException(
                 status_code=404,
-                detail=ErrorResponse(
-                    error_code="SESSION_NOT_FOUND",
-                    message="Session not found or already ended"
-                ).dict()
+                detail=_ERR_SESSION_ALREADY_ENDED
             )
             
     except HTTPException:
@@ -233,10 +229,7 @@ async def end_session(request: SessionEndRequest) -> SessionEndResponse:
         logger.error(f"Error ending session: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                error_code="SESSION_END_ERROR",
-                message="An error occurred while ending the session"
-            ).dict()
+            detail=_ERR_SESSION_END
         )
 
 @router.post("/transfer", response_model=TransferResponse)
@@ -250,10 +243,7 @@ async def request_human_transfer(request: TransferRequest) -> TransferResponse:
         if not session_state:
             raise HTTPException(
                 status_code=404,
-                detail=ErrorResponse(
-                    error_code="SESSION_NOT_FOUND",
-                    message="Session not found"
-                ).dict()
+                detail=_ERR_SESSION_NOT_FOUND
             )
         
         # 标记会话为转人工状态
@@ -264,7 +254,7 @@ async def request_human_transfer(request: TransferRequest) -> TransferResponse:
         
         logger.info(f"Transfer requested for session {request.session_id[:8]}... - Reason: {request.reason}")
         
-        return TransferResponse(
+        return TransferResponse.model_construct(
             success=True,
             message="Connecting you to a human agent. Please wait a moment...",
             transfer_id=transfer_id
@@ -276,10 +266,7 @@ async def request_human_transfer(request: TransferRequest) -> TransferResponse:
         logger.error(f"Error requesting transfer: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                error_code="TRANSFER_ERROR",
-                message="An error occurred while requesting human assistance"
-            ).dict()
+            detail=_ERR_TRANSFER
         )
 
 @router.get("/session/{session_id}/stats")
@@ -294,19 +281,16 @@ async def get_session_stats(session_id: str) -> Dict[str, Any]:
         if not session_state:
             raise HTTPException(
                 status_code=404,
-                detail=ErrorResponse(
-                    error_code="SESSION_NOT_FOUND",
-                    message="Session not found or expired"
-                ).dict()
+                detail=_ERR_SESSION_EXPIRED
             )
         
         return {
             "session_id": session_id,
-            "created_at": session_state.created_at.isoformat(),
-            "last_activity": session_state.last_activity.isoformat(),
+            "created_at": session_state.create_time.isoformat(),
+            "last_activity": session_state.update_time.isoformat(),
             "total_turns": len(session_state.turns),
-            "intents_used": list(set(turn.intent for turn in session_state.turns)),
-            "avg_confidence": sum(turn.confidence for turn in session_state.turns) / len(session_state.turns) if session_state.turns else 0
+            "intents_used": list(session_state.intents_used),
+            "avg_confidence": session_state.confidence_sum / len(session_state.turns) if session_state.turns else 0
         }
         
     except HTTPException:
@@ -315,8 +299,5 @@ async def get_session_stats(session_id: str) -> Dict[str, Any]:
         logger.error(f"Error getting session stats: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=ErrorResponse(
-                error_code="STATS_ERROR",
-                message="Unable to retrieve session statistics at this time."
-            ).dict()
+            detail=_ERR_STATS
         )
\ No newline at end of file
@@ -1,7 +1,7 @@
 """
 Health check and system status endpoints.
 """
-from datetime import datetime
+from datetime import datetime, timezone
 from fastapi import APIRouter
 from app.api.models import HealthResponse
 from app.state.session_manager import session_manager
@@ -11,6 +11,13 @@ router = APIRouter(
     tags=["health"]
 )
 
+_UTC = timezone.utc
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time as an ISO 8601 string with a 'Z' suffix."""
+    return datetime.now(_UTC).isoformat().replace("+00:00", "Z")
+
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check() -> HealthResponse:
@@ -20,7 +27,7 @@ async def health_check() -> HealthResponse:
     """
     return HealthResponse(
         ok=True,
-        timestamp=datetime.utcnow().isoformat() + "Z",
+        timestamp=_utc_timestamp(),
         version=__version__
     )
 
@@ -35,7 +42,7 @@ async def system_status():
     
     return {
         "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat() + "Z",
+        "timestamp": _utc_timestamp(),
         "version": __version__,
         "session_statistics": session_stats,
         "components": {
@@ -2,8 +2,9 @@
 CRUD operations for database models.
 """
 from datetime import datetime
-from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy import insert, select, update, func
+from sqlalchemy.orm import Session, selectinload
 from . import models
 
 def create_session(db: Session, session_id: str) -> models.Session:
@@ -21,17 +22,51 @@ def create_session(db: Session, session_id: str) -> models.Session:
     return db_session
 
 def get_session(db: Session, session_id: str) -> Optional[models.Session]:
-    """Get session by ID."""
-    return db.query(models.Session).filter(models.Session.session_id == session_id).first()
+    """
+    Get session by ID.
+    Served from the DB session's identity map when already loaded; commits
+    expire it, so a repeat lookup after a write re-reads the row.
+    """
+    return db.get(models.Session, session_id)
 
-def update_session_activity(db: Session, session_id: str) -> Optional[models.Session]:
+def _update_session(db: Session, session_id: str, **values) -> bool:
+    """
+    Update a session row with a single UPDATE statement and commit.
+    update_time uses the app clock, like every other timestamp and the expiry
+    checks compared against it. Returns whether the session exists.
+    """
+    result = db.execute(
+        update(models.Session)
+        .where(models.Session.session_id == session_id)
+        .values(update_time=datetime.now(), **values),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return result.rowcount > 0
+
+def update_session_activity(db: Session, session_id: str) -> bool:
     """Update session last activity time."""
-    db_session = get_session(db, session_id)
-    if db_session:
-        db_session.update_time = datetime.now()
-        db.commit()
-        db.refresh(db_session)
-    return db_session
+    return _update_session(db, session_id)
+
+def _reserve_turn_numbers(db: Session, session_id: str, now: datetime, count: int = 1) -> int:
+    """
+    Atomically advance a session's turn counter by `count` and return the new value,
+    i.e. the last of the reserved turn numbers.
+    MySQL has no UPDATE ... RETURNING, so the new value is passed through
+    LAST_INSERT_ID(expr) and read back from the statement result.
+    update_time is set explicitly from the app clock; otherwise the column's
+    onupdate would stamp it with the database's NOW().
+    """
+    result = db.execute(
+        update(models.Session)
+        .where(models.Session.session_id == session_id)
+        .values(
+            turn_count=func.last_insert_id(models.Session.turn_count + count),
+            update_time=now
+        ),
+        execution_options={"synchronize_session": False}
+    )
+    return result.lastrowid
 
 def create_conversation_turn(
     db: Session,
@@ -41,15 +76,15 @@ def create_conversation_turn(
     confidence: float,
     bot_response: str,
     slots: Dict[str, Any] = None,
-    processing_time: Optional[int] = None
+    processing_time: Optional[int] = None,
+    now: Optional[datetime] = None,
+    emotion: str = 'neutral',
+    urgency: str = 'low'
 ) -> models.ConversationTurn:
-    """Create a new conversation turn."""
-    # Get the current turn number for this session
-    turn_number = db.query(models.ConversationTurn).filter(
-        models.ConversationTurn.session_id == session_id
-    ).count() + 1
+    """Create a new conversation turn. `now` lets the caller share one request timestamp."""
+    now = now or datetime.now()
+    turn_number = _reserve_turn_numbers(db, session_id, now)
 
-    now = datetime.now()
     db_turn = models.ConversationTurn(
         session_id=session_id,
         user_input=user_input,
@@ -59,29 +94,117 @@ def create_conversation_turn(
         slots=slots or {},
         turn_number=turn_number,
         processing_time=processing_time,
+        emotion=emotion,
+        urgency=urgency,
         create_time=now,
         update_time=now
     )
     db.add(db_turn)
     db.commit()
-    db.refresh(db_turn)
     return db_turn
 
+def create_conversation_turns_bulk(db: Session, turns: List[Dict[str, Any]]) -> int:
+    """
+    Create many conversation turns with one multi-row INSERT and a single commit.
+    Each dict takes the same fields as create_conversation_turn(), plus an optional
+    create_time; turn numbers are reserved from each session's counter in order.
+    Returns the number of inserted turns.
+    """
+    if not turns:
+        return 0
+
+    now = datetime.now()
+
+    # Reserve a contiguous block of turn numbers per session, locking the
+    # session rows in a fixed order so concurrent writers cannot deadlock
+    counts: Dict[str, int] = {}
+    for turn in turns:
+        counts[turn["session_id"]] = counts.get(turn["session_id"], 0) + 1
+    next_number = {
+        session_id: _reserve_turn_numbers(db, session_id, now, counts[session_id]) - counts[session_id] + 1
+        for session_id in sorted(counts)
+    }
+
+    rows = []
+    for turn in turns:
+        session_id = turn["session_id"]
+        rows.append({
+            "session_id": session_id,
+            "user_input": turn["user_input"],
+            "intent": turn["intent"],
+            "confidence": turn["confidence"],
+            "bot_response": turn["bot_response"],
+            "slots": turn.get("slots") or {},
+            "turn_number": next_number[session_id],
+            "processing_time": turn.get("processing_time"),
+            "emotion": turn.get("emotion", "neutral"),
+            "urgency": turn.get("urgency", "low"),
+            "create_time": turn.get("create_time", now),
+            "update_time": now
+        })
+        next_number[session_id] += 1
+
+    # A list of parameter sets runs as executemany, which the MySQL driver
+    # rewrites into batched multi-row INSERT ... VALUES statements
+    db.execute(insert(models.ConversationTurn), rows)
+    db.commit()
+    return len(rows)
+
 def get_session_turns(
     db: Session, 
     session_id: str,
-    limit: Optional[int] = None
+    limit: Optional[int] = None,
+    with_feedback: bool = False,
+    before_turn: Optional[int] = None
 ) -> List[models.ConversationTurn]:
-    """Get conversation turns for a session."""
+    """
+    Get conversation turns for a session, newest first.
+    Set with_feedback=True when the caller reads turn.feedback; it is then loaded
+    for all turns in one extra SELECT instead of one lazy load per turn.
+    Page through older turns with the keyset cursor before_turn (the smallest
+    turn_number of the previous page) rather than an OFFSET; each page is then
+    one range scan on idx_session_turn regardless of history length.
+    """
     query = db.query(models.ConversationTurn).filter(
         models.ConversationTurn.session_id == session_id
     ).order_by(models.ConversationTurn.turn_number.desc())
     
+    if before_turn is not None:
+        query = query.filter(models.ConversationTurn.turn_number < before_turn)
+    
+    if with_feedback:
+        query = query.options(selectinload(models.ConversationTurn.feedback))
+    
     if limit:
         query = query.limit(limit)
     
     return query.all()
 
+def get_session_with_turns(
+    db: Session,
+    session_id: str,
+    limit: Optional[int] = None
+) -> Tuple[Optional[models.Session], List[models.ConversationTurn]]:
+    """
+    Get a session and its latest turns (newest first) in one round trip.
+    Session LEFT JOIN turns, so a session without turns still comes back.
+    Returns (None, []) when the session does not exist.
+    """
+    query = select(models.Session, models.ConversationTurn).outerjoin(
+        models.ConversationTurn,
+        models.ConversationTurn.session_id == models.Session.session_id
+    ).where(
+        models.Session.session_id == session_id
+    ).order_by(models.ConversationTurn.turn_number.desc())
+    
+    if limit:
+        query = query.limit(limit)
+    
+    rows = db.execute(query).all()
+    if not rows:
+        return None, []
+    return rows[0][0], [turn for _, turn in rows if turn is not None]
+
 def create_user_feedback(
     db: Session,
     session_id: str,
@@ -101,19 +224,12 @@ def create_user_feedback(
     )
     db.add(db_feedback)
     db.commit()
-    db.refresh(db_feedback)
     return db_feedback
 
 def update_session_data(db: Session, session_id: str, session_data: dict) -> bool:
     """Update session data."""
     try:
-        db_session = get_session(db, session_id)
-        if db_session:
-            db_session.session_data = session_data
-            db_session.update_time = datetime.now()
-            db.commit()
-            return True
-        return False
+        return _update_session(db, session_id, session_data=session_data)
     except Exception as e:
         db.rollback()
         return False
@@ -138,25 +254,55 @@ def get_intent_analytics(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     intent: Optional[str] = None
-) -> List[models.IntentAnalytics]:
-    """Get intent analytics within date range."""
-    query = db.query(models.IntentAnalytics)
+) -> List[Any]:
+    """
+    Get intent analytics within date range, aggregated per intent in SQL.
+    Returns rows of (intent, total_occurrences, avg_confidence, success_rate);
+    the per-row averages are weighted by each row's total_occurrences.
+    """
+    occurrences = func.sum(models.IntentAnalytics.total_occurrences)
+    query = select(
+        models.IntentAnalytics.intent,
+        occurrences.label("total_occurrences"),
+        (func.sum(models.IntentAnalytics.avg_confidence * models.IntentAnalytics.total_occurrences)
+         / func.nullif(occurrences, 0)).label("avg_confidence"),
+        (func.sum(models.IntentAnalytics.success_rate * models.IntentAnalytics.total_occurrences)
+         / func.nullif(occurrences, 0)).label("success_rate")
+    )
     
     if start_date:
-        query = query.filter(models.IntentAnalytics.create_time >= start_date)
+        query = query.where(models.IntentAnalytics.create_time >= start_date)
     if end_date:
-        query = query.filter(models.IntentAnalytics.create_time <= end_date)
+        query = query.where(models.IntentAnalytics.create_time <= end_date)
     if intent:
-        query = query.filter(models.IntentAnalytics.intent == intent)
+        query = query.where(models.IntentAnalytics.intent == intent)
     
-    return query.all()
+    return db.execute(query.group_by(models.IntentAnalytics.intent)).all()
 
-def close_session(db: Session, session_id: str) -> Optional[models.Session]:
-    """Close a chat session."""
-    db_session = get_session(db, session_id)
-    if db_session:
-        db_session.status = 'closed'
-        db_session.update_time = datetime.now()
+def expire_sessions(db: Session, expiry_time: datetime, batch_size: int = 1000) -> int:
+    """
+    Mark active sessions idle since before expiry_time as expired, without loading
+    the rows. Runs UPDATE ... LIMIT batch_size in its own transaction until a batch
+    comes back short, so a large backlog never holds row locks for long.
+    Returns the number of expired sessions.
+    """
+    stmt = (
+        update(models.Session)
+        .where(
+            models.Session.status == 'active',
+            models.Session.update_time < expiry_time
+        )
+        .values(status='expired')
+        .with_dialect_options(mysql_limit=batch_size)
+    )
+    total = 0
+    while True:
+        result = db.execute(stmt, execution_options={"synchronize_session": False})
         db.commit()
-        db.refresh(db_session)
-    return db_session
\ No newline at end of file
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+def close_session(db: Session, session_id: str) -> bool:
+    """Close a chat session."""
+    return _update_session(db, session_id, status='closed')
\ No newline at end of file
@@ -5,7 +5,7 @@ from datetime import datetime
 from typing import Dict, Any
 from sqlalchemy import (
     Column, Integer, String, DateTime, Text, 
-    Float, Enum, JSON, ForeignKey, BigInteger
+    Float, Enum, JSON, ForeignKey, BigInteger, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -22,6 +22,7 @@ class Session(Base):
         default='active'
     )
     session_data = Column(JSON)
+    turn_count = Column(Integer, nullable=False, default=0)  # number of turns recorded so far
     create_time = Column(DateTime, nullable=False, default=func.now())
     update_time = Column(
         DateTime, 
@@ -30,6 +31,11 @@ class Session(Base):
         onupdate=func.now()
     )
 
+    __table_args__ = (
+        # Expired-session sweep (status = 'active' AND update_time < ?)
+        Index('idx_status_update_time', 'status', 'update_time'),
+    )
+
     # Relationships
     turns = relationship("ConversationTurn", back_populates="session")
     feedback = relationship("UserFeedback", back_populates="session")
@@ -63,6 +69,14 @@ class ConversationTurn(Base):
     create_time = Column(DateTime, nullable=False, default=func.now())
     update_time = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # Serves get_session_turns (latest turns of a session) with an index range scan
+        Index('idx_session_turn', 'session_id', turn_number.desc()),
+        # Covering indexes for the dashboard's date-range aggregates
+        Index('idx_ct_time_emotion_urgency', 'create_time', 'emotion', 'urgency', 'session_id'),
+        Index('idx_ct_time_intent', 'create_time', 'intent', 'emotion', 'urgency'),
+    )
+
     # Relationships
     session = relationship("Session", back_populates="turns")
     feedback = relationship("UserFeedback", back_populates="turn")
@@ -97,6 +111,11 @@ class IntentAnalytics(Base):
     create_time = Column(DateTime, nullable=False, default=func.now())
     update_time = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # Date-range scans grouped by intent (get_intent_analytics)
+        Index('idx_create_time_intent', 'create_time', 'intent'),
+    )
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert analytics to dictionary."""
         return {
@@ -144,6 +163,11 @@ class UserFeedback(Base):
     create_time = Column(DateTime, nullable=False, default=func.now())
     update_time = Column(DateTime, nullable=False, default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # Feedback timeline of a session
+        Index('idx_session_time', 'session_id', 'create_time'),
+    )
+
     # Relationships
     session = relationship("Session", back_populates="feedback")
     turn = relationship("ConversationTurn", back_populates="feedback")
@@ -2,53 +2,107 @@ import json
 import os
 from typing import Dict, Tuple, List, Optional
 import random
-from sentence_transformers import util
+import numpy as np
+from app.config import settings
 from .model_singleton import model
 
 class IntentClassifier:
     def __init__(
         self,
         patterns_file: str = 'app/data/chat_patterns.json',
-        casual_threshold: float = 0.65  # 降低阈值从0.75到0.65
+        casual_threshold: float = 0.65,  # 降低阈值从0.75到0.65
+        embeddings_cache: str = 'app/data/casual_embeddings.npy'
     ):
         """初始化意图分类器"""
         self.casual_threshold = casual_threshold
+        self._rng = random.Random()  # 实例自己的随机数生成器，不共享random模块的全局状态
         
         # 加载对话模式
         with open(patterns_file, 'r', encoding='utf-8') as f:
             self.patterns = json.load(f)
             
-        # 预计算所有casual patterns的embeddings（只在初始化时显示进度条）
+        # idx_to_category与casual_texts同步构建，按下标直接得到所属category
         self.casual_texts = []
+        self.idx_to_category = []
         for category, patterns in self.patterns['casual_patterns'].items():
             self.casual_texts.extend(patterns)
-        self.casual_embeddings = model.encode_texts(self.casual_texts, show_progress_bar=True)
+            self.idx_to_category.extend([category] * len(patterns))
+        
+        # casual patterns的embeddings矩阵：优先从磁盘缓存mmap读取，缓存缺失或过期时重新编码
+        self.casual_matrix = self._load_casual_matrix(patterns_file, embeddings_cache)
+        
+        # 预分配查询向量与相似度的输出缓冲区，classify时不再分配新数组
+        # （chat接口在事件循环线程中同步调用classify，缓冲区不会被并发使用）
+        self._query_buf = np.empty(self.casual_matrix.shape[1], dtype=np.float32)
+        self._sims_out = np.empty(self.casual_matrix.shape[0], dtype=np.float32)
+        
+    def _load_casual_matrix(self, patterns_file: str, cache_file: str) -> np.ndarray:
+        """
+        读取缓存的casual patterns矩阵。缓存比patterns文件新、且模型与pattern列表
+        都一致时直接mmap加载；否则重新编码并写回缓存（写入失败不影响启动）。
+        """
+        meta_file = os.path.splitext(cache_file)[0] + '.json'
+        meta = {
+            'model': settings.SEMANTIC_MODEL,
+            'backend': settings.SEMANTIC_BACKEND,
+            'casual_texts': self.casual_texts
+        }
+        
+        try:
+            if os.path.getmtime(cache_file) > os.path.getmtime(patterns_file):
+                with open(meta_file, 'r', encoding='utf-8') as f:
+                    if json.load(f) == meta:
+                        return np.load(cache_file, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+            
+        # 预计算所有casual patterns的embeddings（只在初始化时显示进度条）
+        embeddings = model.encode_texts(self.casual_texts, show_progress_bar=True)
+        
+        # 预先L2归一化为连续的FP32矩阵，余弦相似度即为一次矩阵-向量乘法
+        embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        
+        # 先写临时文件再替换，避免多个worker同时启动时读到写了一半的缓存
+        try:
+            tmp_suffix = f'.{os.getpid()}.tmp'
+            with open(cache_file + tmp_suffix, 'wb') as f:
+                np.save(f, matrix)
+            with open(meta_file + tmp_suffix, 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(cache_file + tmp_suffix, cache_file)
+            os.replace(meta_file + tmp_suffix, meta_file)
+        except OSError:
+            pass
+            
+        return matrix
         
     def classify(self, query: str) -> Tuple[str, float, Dict[str, any]]:
         """对输入文本进行分类"""
-        # 计算查询文本的embedding（不显示进度条）
-        query_embedding = model.encode_text(query, show_progress_bar=False)
+        # 计算查询文本的embedding（带缓存）
+        query_embedding = model.encode_query(query)
         
-        # 计算与所有casual patterns的相似度
-        similarities = util.pytorch_cos_sim(query_embedding, self.casual_embeddings)[0]
-        max_similarity = float(similarities.max())
+        # 计算与所有casual patterns的余弦相似度（缓存的embedding只读，归一化结果写入缓冲区）
+        np.divide(query_embedding, np.linalg.norm(query_embedding), out=self._query_buf)
+        similarities = np.dot(self.casual_matrix, self._query_buf, out=self._sims_out)
+        max_idx = int(similarities.argmax())
+        max_similarity = float(similarities[max_idx])
         
         # 如果相似度超过阈值，判定为casual对话
         if max_similarity >= self.casual_threshold:
-            # 找出最相似的pattern
-            max_idx = int(similarities.argmax())
+            # 最相似的pattern
             matched_text = self.casual_texts[max_idx]
+            category = self.idx_to_category[max_idx]
+            
+            return 'casual', max_similarity, {
+                'category': category,
+                'response': self.casual_response(category),
+                'matched_pattern': matched_text
+            }
             
-            # 确定category
-            for category, patterns in self.patterns['casual_patterns'].items():
-                if matched_text in patterns:
-                    # 随机选择一个对应的回复
-                    response = random.choice(self.patterns['casual_responses'][category])
-                    return 'casual', max_similarity, {
-                        'category': category,
-                        'response': response,
-                        'matched_pattern': matched_text
-                    }
-                    
         # 默认返回search类型
-        return 'search', 1.0 - max_similarity, {}
\ No newline at end of file
+        return 'search', 1.0 - max_similarity, {}
+        
+    def casual_response(self, category: str) -> str:
+        """随机选择一个对应category的回复"""
+        return self._rng.choice(self.patterns['casual_responses'][category])
\ No newline at end of file
@@ -3,10 +3,16 @@ Model singleton to avoid multiple model loads
 """
 import os
 import logging
+from functools import lru_cache
 from sentence_transformers import SentenceTransformer
 
+from app.config import settings
+
 logger = logging.getLogger(__name__)
 
+# 查询embedding缓存条数（按规范化文本精确匹配）
+QUERY_CACHE_SIZE = 4096
+
 class ModelSingleton:
     _instance = None
     _model = None
@@ -18,23 +24,66 @@ class ModelSingleton:
         
         # 如果是新进程或模型未初始化，则加载模型
         if cls._pid != current_pid or cls._model is None:
-            logger.info(f"Initializing model for process {current_pid}")
-            cls._model = SentenceTransformer('all-MiniLM-L6-v2')
+            logger.info(f"Initializing model for process {current_pid} (backend: {settings.SEMANTIC_BACKEND})")
+            cls._model = cls._load_model()
             cls._pid = current_pid
         
         return cls._model
     
+    @staticmethod
+    def _load_model() -> SentenceTransformer:
+        """按配置加载模型：默认PyTorch FP32，或ONNX Runtime INT8量化版本"""
+        if settings.SEMANTIC_BACKEND == "onnx":
+            return SentenceTransformer(
+                settings.SEMANTIC_MODEL,
+                backend="onnx",
+                model_kwargs={"file_name": settings.SEMANTIC_ONNX_FILE}
+            )
+        return SentenceTransformer(settings.SEMANTIC_MODEL)
+    
     @classmethod 
     def encode_text(cls, text: str, show_progress_bar: bool = False):
-        """编码文本，默认不显示进度条"""
+        """编码文本（L2归一化，Milvus使用IP度量依赖于此），默认不显示进度条"""
         model = cls.get_model()
-        return model.encode(text, show_progress_bar=show_progress_bar)
+        return model.encode(text, normalize_embeddings=True, show_progress_bar=show_progress_bar)
     
     @classmethod
     def encode_texts(cls, texts: list, show_progress_bar: bool = False):
-        """批量编码文本，默认不显示进度条"""
+        """批量编码文本（L2归一化），默认不显示进度条"""
         model = cls.get_model()
-        return model.encode(texts, show_progress_bar=show_progress_bar)
+        return model.encode(texts, normalize_embeddings=True, show_progress_bar=show_progress_bar)
+    
+    @classmethod
+    def lowercases_input(cls) -> bool:
+        """模型分词器是否会先转小写（如默认的uncased模型）"""
+        return bool(getattr(cls.get_model().tokenizer, 'do_lower_case', False))
+    
+    @classmethod
+    def normalize_query(cls, text: str) -> str:
+        """
+        查询缓存键：合并空白；仅当分词器本身转小写时才转小写，
+        因此规范化不会改变embedding（SEMANTIC_MODEL可配置为区分大小写的模型）。
+        """
+        normalized = ' '.join(text.split())
+        if cls.lowercases_input():
+            normalized = normalized.lower()
+        return normalized
+    
+    @classmethod
+    def encode_query(cls, text: str):
+        """
+        编码用户查询，结果按normalize_query()的规范化文本缓存。
+        返回只读数组，调用方不要原地修改。
+        """
+        return _encode_query_cached(cls.normalize_query(text))
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _encode_query_cached(normalized_text: str):
+    embedding = ModelSingleton.encode_text(normalized_text)
+    embedding.setflags(write=False)
+    return embedding
+
 
 # Global instance
 model = ModelSingleton()
\ No newline at end of file
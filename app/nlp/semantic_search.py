@@ -1,10 +1,50 @@
+import os
 import logging
+import threading
 from typing import List, Dict, Tuple, Optional
+import numpy as np
+from cachetools import TTLCache
 from pymilvus import Collection, connections
 from .model_singleton import model
 
 logger = logging.getLogger(__name__)
 
+# 与migrations/milvus.py一致的HNSW索引参数
+INDEX_PARAMS = {
+    "index_type": "HNSW",
+    "metric_type": "IP",  # 向量均已归一化，内积即余弦相似度
+    "params": {"M": 16, "efConstruction": 200}
+}
+
+# FAQ检索结果缓存（按与查询embedding相同的规范化文本精确匹配，不按向量相似度合并不同问题）
+RESULT_CACHE_SIZE = 8192
+RESULT_CACHE_TTL = 300  # 秒
+
+# 进程内共享的Milvus连接与已加载的集合，键为(pid, host, port, db, alias, collection)
+_CONN_CACHE: Dict[tuple, Collection] = {}
+_CONN_LOCK = threading.Lock()
+
+def _get_collection(host: str, port: str, db: str, alias: str, collection_name: str) -> Collection:
+    """返回本进程已连接并加载的集合，首次调用时建立连接（fork后的子进程重新连接）"""
+    key = (os.getpid(), host, port, db, alias, collection_name)
+    with _CONN_LOCK:
+        collection = _CONN_CACHE.get(key)
+        if collection is not None:
+            return collection
+            
+        # 连接Milvus
+        connections.connect(alias=alias, host=host, port=port, db_name=db)
+        collection = Collection(collection_name, using=alias)
+        
+        # 没有向量索引时先建HNSW索引，避免退化为全量扫描
+        if not collection.has_index():
+            logger.info(f"Creating HNSW index on {collection_name}.embedding")
+            collection.create_index(field_name="embedding", index_params=INDEX_PARAMS)
+        collection.load()  # 加载集合到内存
+        
+        _CONN_CACHE[key] = collection
+        return collection
+
 class SemanticSearch:
     def __init__(
         self,
@@ -14,53 +54,87 @@ class SemanticSearch:
         milvus_alias: str = "q3",
         collection_name: str = "faq_qa",
         similarity_threshold: float = 0.6,  # 降低阈值
-        top_k: int = 3
+        top_k: int = 3,
+        fused_casual: bool = False  # 集合中是否同时存放casual patterns（kind='casual'）
     ):
         """初始化语义搜索类"""
         self.similarity_threshold = similarity_threshold
         self.top_k = top_k
+        self.fused_casual = fused_casual
         self.milvus_alias = milvus_alias
         self.collection_name = collection_name
         
-        # 连接Milvus
-        connections.connect(
-            alias=milvus_alias,
-            host=milvus_host,
-            port=milvus_port,
-            db_name=milvus_db
-        )
-        self.collection = Collection(collection_name, using=milvus_alias)
-        self.collection.load()  # 加载集合到内存
+        # 复用进程内的Milvus连接和集合
+        self.collection = _get_collection(milvus_host, milvus_port, milvus_db, milvus_alias, collection_name)
         
-    def search(self, query: str) -> Tuple[bool, Optional[Dict], float]:
-        """搜索最相似的FAQ"""
-        # 生成查询向量（不显示进度条）
-        query_embedding = model.encode_text(query, show_progress_bar=False)
-        
-        # 在Milvus中搜索
-        search_params = {
-            "metric_type": "COSINE",
-            "params": {"nprobe": 10}
+        # HNSW搜索宽度：ef须不小于limit，越大召回越高
+        self.search_params = {
+            "metric_type": "IP",
+            "params": {"ef": max(top_k * 4, 32)}
         }
         
+        # 重复问题直接返回缓存的(found, faq_match, score)，跳过编码和Milvus往返
+        self._result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+        
+    def _search(self, query: str, output_fields: List[str], expr: Optional[str] = None):
+        """在Milvus中检索top_k，返回第一个查询的命中列表"""
+        # 生成查询向量（带缓存，与意图分类共用）
+        query_embedding = model.encode_query(query)
+        
+        # 在Milvus中搜索（直接传数组，不转成Python list；embedding字段为FLOAT16_VECTOR）
         results = self.collection.search(
-            data=[query_embedding.tolist()],
+            data=[query_embedding.astype(np.float16)],
             anns_field="embedding",
-            param=search_params,
+            param=self.search_params,
             limit=self.top_k,
-            output_fields=["faq_uuid", "category", "question", "answer"]
+            expr=expr,
+            output_fields=output_fields
+        )
+        return results[0] if results else []
+        
+    @staticmethod
+    def _score(hit) -> float:
+        # 限制相似度分数在合理范围内（处理浮点数精度问题）
+        return min(1.0, max(0.0, hit.score))
+        
+    @staticmethod
+    def _to_faq(hit, similarity_score: float) -> Dict:
+        return {
+            "faq_uuid": hit.entity.get('faq_uuid'),
+            "category": hit.entity.get('category'),
+            "question": hit.entity.get('question'),
+            "answer": hit.entity.get('answer'),
+            "similarity": similarity_score
+        }
+        
+    def search(self, query: str) -> Tuple[bool, Optional[Dict], float]:
+        """搜索最相似的FAQ（结果按规范化文本缓存，并用规范化文本检索，缓存项总是其键本身的结果）"""
+        key = model.normalize_query(query)
+        result = self._result_cache.get(key)
+        if result is None:
+            result = self._result_cache[key] = self._search_faq(key)
+        return result
+        
+    def invalidate(self):
+        """FAQ集合重新导入或重建索引后清空结果缓存"""
+        self._result_cache.clear()
+        
+    def _search_faq(self, query: str) -> Tuple[bool, Optional[Dict], float]:
+        """在Milvus中搜索最相似的FAQ"""
+        # 集合中存有casual patterns时只检索FAQ
+        hits = self._search(
+            query,
+            ["faq_uuid", "category", "question", "answer"],
+            expr='kind == "faq"' if self.fused_casual else None
         )
 
         # 检查最佳匹配的相似度得分
-        if not results or not results[0]:
+        if not hits:
             logger.info(f"No results found for query: {query}")
             return False, None, 0.0
             
-        best_match = results[0][0]  # 第一个查询的第一个结果
-        similarity_score = float(best_match.score)
-        
-        # 限制相似度分数在合理范围内（处理浮点数精度问题）
-        similarity_score = max(0.0, min(1.0, similarity_score))
+        best_match = hits[0]  # 第一个查询的第一个结果
+        similarity_score = self._score(best_match)
         
         # 添加调试日志
         logger.info(f"Query: '{query}' | Best match: '{best_match.entity.get('question')}' | Score: {similarity_score:.3f} | Threshold: {self.similarity_threshold}")
@@ -71,22 +145,36 @@ class SemanticSearch:
             return False, None, similarity_score
             
         # 返回最佳匹配的FAQ信息
-        matched_faq = {
-            "faq_uuid": best_match.entity.get('faq_uuid'),
-            "category": best_match.entity.get('category'),
-            "question": best_match.entity.get('question'),
-            "answer": best_match.entity.get('answer'),
-            "similarity": similarity_score
-        }
+        matched_faq = self._to_faq(best_match, similarity_score)
         
         logger.info(f"FAQ match found: {matched_faq['question']}")
         return True, matched_faq, similarity_score
         
+    def search_fused(self, query: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """
+        一次ANN检索同时覆盖casual patterns与FAQ（需fused_casual=True）
+        返回(最佳casual命中, 最佳FAQ命中)，top_k内没有的一项为None；阈值由调用方判断
+        """
+        hits = self._search(query, ["faq_uuid", "category", "question", "answer", "kind"])
+        
+        casual_hit, faq_hit = None, None
+        for hit in hits:
+            if hit.entity.get('kind') == 'casual':
+                if casual_hit is None:
+                    casual_hit = {
+                        "category": hit.entity.get('category'),
+                        "matched_pattern": hit.entity.get('question'),
+                        "similarity": self._score(hit)
+                    }
+            elif faq_hit is None:
+                faq_hit = self._to_faq(hit, self._score(hit))
+                
+        logger.info(f"Fused search for '{query}' | casual: {casual_hit} | faq: {faq_hit and faq_hit['question']}")
+        return casual_hit, faq_hit
+        
     def close(self):
-        """关闭Milvus连接"""
-        if hasattr(self, 'collection'):
-            self.collection.release()  # 释放集合
-        connections.disconnect(self.milvus_alias)
+        """连接与集合在进程内共享，断开会影响其他实例，因此这里不做处理"""
+        pass
 
     def __enter__(self):
         return self
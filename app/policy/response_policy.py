@@ -1,11 +1,13 @@
 from typing import Dict, Any
+from app.config import settings
 from app.nlp.semantic_search import SemanticSearch
 from app.nlp.intent_classifier import IntentClassifier
 
 class ResponsePolicy:
     def __init__(self):
         """初始化响应策略"""
-        self.semantic_search = SemanticSearch()  # 使用默认配置
+        self.fused_casual = settings.SEMANTIC_FUSED_CASUAL
+        self.semantic_search = SemanticSearch(fused_casual=self.fused_casual)  # 其余使用默认配置
         self.intent_classifier = IntentClassifier()  # 意图分类器
         
     def get_response(self, query: str) -> Dict[str, Any]:
@@ -21,38 +23,73 @@ class ResponsePolicy:
             - need_human: 是否需要人工介入
             - source: 回复来源 ('casual', 'faq', 'human')
         """
+        if self.fused_casual:
+            return self._get_fused_response(query)
+            
         # 首先进行意图分类
         intent_type, confidence, slots = self.intent_classifier.classify(query)
         
         # 如果是日常对话，直接返回预设回复
         if intent_type == 'casual':
-            return {
-                "response": slots.get('response', 'Hello!'),
-                "confidence": confidence,
-                "need_human": False,
-                "source": "casual",
-                "metadata": {
-                    "category": slots.get('category', 'unknown')
-                }
-            }
+            return self._casual_response(slots.get('response', 'Hello!'), confidence, slots.get('category', 'unknown'))
             
         # 如果是需要查库的对话，进行语义搜索
         found, faq_match, similarity = self.semantic_search.search(query)
         
         if found:
-            return {
-                "response": faq_match["answer"],
-                "confidence": similarity,
-                "need_human": False,
-                "source": "faq",
-                "metadata": {
-                    "faq_uuid": faq_match["faq_uuid"],
-                    "category": faq_match["category"],
-                    "matched_question": faq_match["question"]
-                }
-            }
+            return self._faq_response(faq_match, similarity)
             
         # 如果没有找到合适的答案，转人工处理
+        return self._human_response()
+        
+    def _get_fused_response(self, query: str) -> Dict[str, Any]:
+        """casual patterns与FAQ同在Milvus中：一次ANN检索，按胜出的kind决定回复"""
+        casual_hit, faq_hit = self.semantic_search.search_fused(query)
+        
+        if casual_hit and casual_hit["similarity"] >= self.intent_classifier.casual_threshold:
+            category = casual_hit["category"]
+            return self._casual_response(
+                self.intent_classifier.casual_response(category), casual_hit["similarity"], category
+            )
+            
+        if faq_hit is None:
+            # top_k全部是未达阈值的casual命中（少见），退回只检索FAQ
+            found, faq_hit, similarity = self.semantic_search.search(query)
+            return self._faq_response(faq_hit, similarity) if found else self._human_response()
+            
+        if faq_hit["similarity"] >= self.semantic_search.similarity_threshold:
+            return self._faq_response(faq_hit, faq_hit["similarity"])
+            
+        return self._human_response()
+        
+    @staticmethod
+    def _casual_response(response: str, confidence: float, category: str) -> Dict[str, Any]:
+        return {
+            "response": response,
+            "confidence": confidence,
+            "need_human": False,
+            "source": "casual",
+            "metadata": {
+                "category": category
+            }
+        }
+        
+    @staticmethod
+    def _faq_response(faq_match: Dict[str, Any], similarity: float) -> Dict[str, Any]:
+        return {
+            "response": faq_match["answer"],
+            "confidence": similarity,
+            "need_human": False,
+            "source": "faq",
+            "metadata": {
+                "faq_uuid": faq_match["faq_uuid"],
+                "category": faq_match["category"],
+                "matched_question": faq_match["question"]
+            }
+        }
+        
+    @staticmethod
+    def _human_response() -> Dict[str, Any]:
         return {
             "response": "I apologize, but I need to escalate this to a human agent for better assistance.",
             "confidence": 0.0,
@@ -2,19 +2,29 @@
 Session state management with database storage.
 """
 import time
-import uuid
+import random
+import secrets
 import logging
+from abc import ABC, abstractmethod
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Set
 from dataclasses import dataclass, field
+from cachetools import TTLCache
 from sqlalchemy.orm import Session as DBSession
 
 from app.config import settings
 from app.database import crud, models
-from app.database.base import get_db
+from app.database.base import SessionLocal
+from app.state.turn_writer import TurnWriter, turn_writer
 
 logger = logging.getLogger(__name__)
 
+# Fraction of create_session calls that run the expired-session sweep
+CLEANUP_PROBABILITY = 0.01
+
+# Skip the activity bump while the session was touched within this fraction of its TTL
+ACTIVITY_REFRESH_FRACTION = 0.25
+
 
 @dataclass
 class ConversationTurn:
@@ -35,25 +45,30 @@ class SessionState:
     update_time: datetime
     turns: List[ConversationTurn] = field(default_factory=list)
     context: Dict[str, Any] = field(default_factory=dict)
+    # Running aggregates over `turns`, kept in sync by append_turn()
+    intents_used: Set[str] = field(default_factory=set)
+    confidence_sum: float = 0.0
     
-    def add_turn(self, user_input: str, intent: str, confidence: float, 
-                 bot_response: str, slots: Dict[str, Any] = None):
-        """Add a new conversation turn."""
-        turn = ConversationTurn(
-            create_time=datetime.now(),
-            user_input=user_input,
-            intent=intent,
-            confidence=confidence,
-            bot_response=bot_response,
-            slots=slots or {}
-        )
-        
+    def append_turn(self, turn: ConversationTurn):
+        """Append an existing turn and update the running aggregates."""
         self.turns.append(turn)
-        self.update_time = datetime.now()
-        
-        # Keep only recent turns (configurable)
-        if len(self.turns) > settings.max_session_turns:
-            self.turns = self.turns[-settings.max_session_turns:]
+        self.intents_used.add(turn.intent)
+        self.confidence_sum += turn.confidence
+    
+    def add_recent_turn(self, turn: ConversationTurn, max_turns: int):
+        """
+        Record a new turn. Turns are kept newest first, as loaded from the
+        database, and trimmed to the latest `max_turns`.
+        """
+        self.turns.insert(0, turn)
+        self.update_time = turn.create_time
+        if len(self.turns) > max_turns:
+            del self.turns[max_turns:]
+            self.intents_used = {t.intent for t in self.turns}
+            self.confidence_sum = sum(t.confidence for t in self.turns)
+        else:
+            self.intents_used.add(turn.intent)
+            self.confidence_sum += turn.confidence
     
     def get_last_intent(self) -> Optional[str]:
         """Get the intent from the last turn."""
@@ -65,158 +80,262 @@ class SessionState:
         return datetime.now() > expiry_time
 
 
+class SessionCacheStrategy(ABC):
+    """Pluggable cache for SessionState objects, keyed by session ID."""
+    
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[SessionState]:
+        """Return the cached state, or None when missing or stale."""
+    
+    @abstractmethod
+    def set(self, session_id: str, state: SessionState):
+        """Store a state."""
+    
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Drop a state if present."""
+
+
+class InMemorySessionCacheStrategy(SessionCacheStrategy):
+    """
+    Per-process cache whose entries expire `ttl` seconds after being stored.
+    Holds at most `max_entries` states, evicting the least recently used.
+    """
+    
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self._ttl = ttl
+        self._entries = TTLCache(maxsize=max_entries, ttl=max(ttl, 0))
+    
+    def get(self, session_id: str) -> Optional[SessionState]:
+        return self._entries.get(session_id)
+    
+    def set(self, session_id: str, state: SessionState):
+        if self._ttl <= 0:
+            return
+        self._entries[session_id] = state
+    
+    def delete(self, session_id: str):
+        self._entries.pop(session_id, None)
+
+
 class SessionManager:
     """
     Manages user sessions and conversation state with database storage.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[SessionCacheStrategy] = None,
+        session_factory: Callable[[], DBSession] = SessionLocal,
+        turn_writer: Optional[TurnWriter] = None
+    ):
         self._last_cleanup = time.time()
-        self._db = next(get_db())
+        # Each operation checks a short-lived DB session out of the pool,
+        # so concurrent requests do not serialize on one connection
+        self._session_factory = session_factory
+        # Fronts get_session(); new turns are added to the cached state in place,
+        # other writes invalidate it
+        self._cache = cache or InMemorySessionCacheStrategy(settings.session_cache_ttl_seconds)
+        # When running, new turns are batch-inserted in the background.
+        # A state loaded while a session still has queued turns misses them,
+        # so it is dropped once those turns are written.
+        self._turn_writer = turn_writer
+        self._pending_turns: Dict[str, int] = {}
+        self._refresh_after_flush: Set[str] = set()
+        if turn_writer is not None:
+            turn_writer.add_listener(self._on_turns_written)
+    
+    def _on_turns_written(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            session_id = row["session_id"]
+            left = self._pending_turns.get(session_id, 0) - 1
+            if left > 0:
+                self._pending_turns[session_id] = left
+                continue
+            self._pending_turns.pop(session_id, None)
+            if session_id in self._refresh_after_flush:
+                self._refresh_after_flush.discard(session_id)
+                self._cache.delete(session_id)
     
     def create_session(self, session_id: Optional[str] = None) -> str:
         """Create a new session or return existing session ID."""
-        if session_id:
-            db_session = crud.get_session(self._db, session_id)
-            if db_session and db_session.status == 'active':
-                crud.update_session_activity(self._db, session_id)
-                return session_id
-        
-        # Create new session
-        new_session_id = session_id or self._generate_session_id()
-        crud.create_session(self._db, new_session_id)
-        
-        # Periodic cleanup
-        self._cleanup_expired_sessions()
+        with self._session_factory() as db:
+            if session_id:
+                db_session = crud.get_session(db, session_id)
+                if db_session and db_session.status == 'active':
+                    crud.update_session_activity(db, session_id)
+                    return session_id
+            
+            # Create new session
+            new_session_id = session_id or self._generate_session_id()
+            crud.create_session(db, new_session_id)
+            
+            # Periodic cleanup
+            self._cleanup_expired_sessions(db)
         
         return new_session_id
     
     def get_session(self, session_id: str) -> Optional[SessionState]:
-        """Get session by ID."""
-        db_session = crud.get_session(self._db, session_id)
-        if not db_session or db_session.status != 'active':
-            return None
-            
-        # Convert database session to SessionState
-        now = datetime.now()
-        if (now - db_session.update_time).total_seconds() > settings.session_ttl_minutes * 60:
-            db_session.status = 'expired'
-            self._db.commit()
-            return None
-            
-        # Get recent turns
-        db_turns = crud.get_session_turns(self._db, session_id, limit=settings.max_session_turns)
-        
-        # Create SessionState from database data
-        session_state = SessionState(
-            session_id=db_session.session_id,
-            create_time=db_session.create_time,
-            update_time=db_session.update_time
-        )
+        """Get session by ID, served from the session cache when possible."""
+        cached = self._cache.get(session_id)
+        if cached is not None:
+            if not cached.is_expired():
+                return cached
+            self._cache.delete(session_id)
         
-        # Add turns
-        for db_turn in db_turns:
-            session_state.turns.append(
-                ConversationTurn(
-                    create_time=db_turn.create_time,
-                    user_input=db_turn.user_input,
-                    intent=db_turn.intent,
-                    confidence=db_turn.confidence,
-                    bot_response=db_turn.bot_response,
-                    slots=db_turn.slots or {}
-                )
+        with self._session_factory() as db:
+            # Session row and recent turns in one query
+            db_session, db_turns = crud.get_session_with_turns(
+                db, session_id, limit=settings.max_session_turns
             )
+            if not db_session or db_session.status != 'active':
+                return None
+                
+            # Convert database session to SessionState
+            now = datetime.now()
+            if (now - db_session.update_time).total_seconds() > settings.session_ttl_minutes * 60:
+                db_session.status = 'expired'
+                db.commit()
+                return None
+                
+            # Create SessionState from database data
+            session_state = SessionState(
+                session_id=db_session.session_id,
+                create_time=db_session.create_time,
+                update_time=db_session.update_time
+            )
+            
+            # Add turns
+            for db_turn in db_turns:
+                session_state.append_turn(
+                    ConversationTurn(
+                        create_time=db_turn.create_time,
+                        user_input=db_turn.user_input,
+                        intent=db_turn.intent,
+                        confidence=db_turn.confidence,
+                        bot_response=db_turn.bot_response,
+                        slots=db_turn.slots or {}
+                    )
+                )
         
+        self._cache.set(session_id, session_state)
+        if self._pending_turns.get(session_id):
+            self._refresh_after_flush.add(session_id)
         return session_state
     
     def update_session(self, session_id: str, user_input: str, intent: str, 
-                      confidence: float, bot_response: str, slots: Dict[str, Any] = None):
-        """Update session with new conversation turn."""
-        start_time = time.time()
+                      confidence: float, bot_response: str, slots: Dict[str, Any] = None,
+                      emotion: str = 'neutral', urgency: str = 'low'):
+        """
+        Update session with new conversation turn.
+        The turn is queued on the background turn writer when it is running
+        (must be called from the event loop), otherwise inserted right away.
+        """
+        start_ns = time.monotonic_ns()
+        now = datetime.now()
+        cached = self._cache.get(session_id)
         
-        # Update session activity
-        crud.update_session_activity(self._db, session_id)
+        with self._session_factory() as db:
+            # Update session activity, unless the cached state shows a recent bump
+            refresh_after = settings.session_ttl_minutes * 60 * ACTIVITY_REFRESH_FRACTION
+            if cached is None or (now - cached.update_time).total_seconds() > refresh_after:
+                crud.update_session_activity(db, session_id)
+            
+            # Create new turn
+            processing_time = (time.monotonic_ns() - start_ns) // 1_000_000  # Convert to milliseconds
+            turn = dict(
+                session_id=session_id,
+                user_input=user_input,
+                intent=intent,
+                confidence=confidence,
+                bot_response=bot_response,
+                slots=slots,
+                processing_time=processing_time,
+                emotion=emotion,
+                urgency=urgency
+            )
+            if self._turn_writer and self._turn_writer.running:
+                self._turn_writer.enqueue({**turn, "create_time": now})
+                self._pending_turns[session_id] = self._pending_turns.get(session_id, 0) + 1
+            else:
+                crud.create_conversation_turn(db, now=now, **turn)
         
-        # Create new turn
-        processing_time = int((time.time() - start_time) * 1000)  # Convert to milliseconds
-        crud.create_conversation_turn(
-            self._db,
-            session_id=session_id,
-            user_input=user_input,
-            intent=intent,
-            confidence=confidence,
-            bot_response=bot_response,
-            slots=slots,
-            processing_time=processing_time
-        )
+        # Keep the cached state current so the next request skips the turns SELECT
+        # (recording a turn also stamps the session's update_time with `now`)
+        if cached is not None:
+            cached.add_recent_turn(
+                ConversationTurn(
+                    create_time=now,
+                    user_input=user_input,
+                    intent=intent,
+                    confidence=confidence,
+                    bot_response=bot_response,
+                    slots=slots or {}
+                ),
+                settings.max_session_turns
+            )
     
     def delete_session(self, session_id: str):
         """Close a session."""
-        crud.close_session(self._db, session_id)
+        self._cache.delete(session_id)
+        with self._session_factory() as db:
+            crud.close_session(db, session_id)
     
     def get_session_stats(self) -> Dict[str, Any]:
         """Get session statistics from database."""
         # Get current date analytics
         today = datetime.now().date()
-        analytics = crud.get_session_analytics(
-            self._db,
-            start_date=today,
-            end_date=today
-        )
-        
-        if analytics:
-            stats = analytics[0].to_dict()
-        else:
-            # Count current sessions if no analytics
-            active_sessions = self._db.query(models.Session).filter(
-                models.Session.status == 'active'
-            ).count()
+        with self._session_factory() as db:
+            analytics = crud.get_session_analytics(
+                db,
+                start_date=today,
+                end_date=today
+            )
             
-            stats = {
-                "total_sessions": active_sessions,
-                "avg_turns_per_session": 0,
-                "avg_session_duration": 0
-            }
+            if analytics:
+                stats = analytics[0].to_dict()
+            else:
+                # Count current sessions if no analytics
+                active_sessions = db.query(models.Session).filter(
+                    models.Session.status == 'active'
+                ).count()
+                
+                stats = {
+                    "total_sessions": active_sessions,
+                    "avg_turns_per_session": 0,
+                    "avg_session_duration": 0
+                }
         
         stats["last_cleanup"] = self._last_cleanup
         return stats
     
     def _generate_session_id(self) -> str:
-        """Generate a unique session ID."""
-        return str(uuid.uuid4())
+        """Generate a unique session ID (128 random bits, 22 URL-safe chars)."""
+        return secrets.token_urlsafe(16)
     
-    def _cleanup_expired_sessions(self):
+    def _cleanup_expired_sessions(self, db: DBSession):
         """Update expired sessions in database."""
-        current_time = time.time()
-        
-        # Only cleanup every 5 minutes
-        if current_time - self._last_cleanup < 300:
+        # Only sweep on a small random fraction of calls
+        if random.random() >= CLEANUP_PROBABILITY:
             return
             
-        # Find and update expired sessions
+        # Expire stale sessions with one bulk UPDATE
         expiry_time = datetime.now() - timedelta(minutes=settings.session_ttl_minutes)
-        expired_sessions = self._db.query(models.Session).filter(
-            models.Session.status == 'active',
-            models.Session.update_time < expiry_time
-        ).all()
-        
-        for session in expired_sessions:
-            session.status = 'expired'
-        
-        self._db.commit()
-        self._last_cleanup = current_time
+        crud.expire_sessions(db, expiry_time)
+        self._last_cleanup = time.time()
 
     def save_feedback(self, session_id: str, feedback_type: str, feedback_text: str = None) -> bool:
         """保存用户反馈"""
         try:
             from app.database import crud
             
-            feedback = crud.create_user_feedback(
-                db=self._db,
-                session_id=session_id,
-                feedback_type=feedback_type,
-                feedback_text=feedback_text
-            )
+            with self._session_factory() as db:
+                feedback = crud.create_user_feedback(
+                    db=db,
+                    session_id=session_id,
+                    feedback_type=feedback_type,
+                    feedback_text=feedback_text
+                )
             return True if feedback else False
             
         except Exception as e:
@@ -225,47 +344,42 @@ class SessionManager:
     
     def end_session(self, session_id: str, end_reason: str = "user_ended") -> bool:
         """结束会话"""
+        self._cache.delete(session_id)
         try:
-            from app.database import crud
-            
-            # 更新session状态
-            db_session = crud.get_session(self._db, session_id)
-            if not db_session:
-                return False
+            # 更新session状态（异常时退出with块即回滚并归还连接）
+            with self._session_factory() as db:
+                if not crud.close_session(db, session_id):
+                    return False
                 
-            db_session.status = 'closed'
-            db_session.update_time = datetime.now()
-            
-            self._db.commit()
             logger.info(f"Session {session_id} ended with reason: {end_reason}")
             return True
             
         except Exception as e:
             logger.error(f"Error ending session: {str(e)}")
-            self._db.rollback()
             return False
     
     def request_transfer(self, session_id: str, reason: str = None) -> str:
         """请求转人工"""
         try:
             from app.database import crud
-            import uuid
             
             # 生成转接ID
-            transfer_id = str(uuid.uuid4())[:8]
+            transfer_id = secrets.token_hex(4)
+            self._cache.delete(session_id)
             
             # 更新session状态（如果支持transferred状态）
-            db_session = crud.get_session(self._db, session_id)
-            if db_session:
-                # 可以在session_data中记录转接信息
-                session_data = db_session.session_data or {}
-                session_data['transfer_requested'] = True
-                session_data['transfer_id'] = transfer_id
-                session_data['transfer_reason'] = reason
-                session_data['transfer_time'] = datetime.now().isoformat()
-                
-                # 更新数据库
-                crud.update_session_data(self._db, session_id, session_data)
+            with self._session_factory() as db:
+                db_session = crud.get_session(db, session_id)
+                if db_session:
+                    # 可以在session_data中记录转接信息
+                    session_data = db_session.session_data or {}
+                    session_data['transfer_requested'] = True
+                    session_data['transfer_id'] = transfer_id
+                    session_data['transfer_reason'] = reason
+                    session_data['transfer_time'] = datetime.now().isoformat()
+                    
+                    # 更新数据库
+                    crud.update_session_data(db, session_id, session_data)
             
             logger.info(f"Transfer requested for session {session_id} - ID: {transfer_id}")
             return transfer_id
@@ -276,4 +390,4 @@ class SessionManager:
 
 
 # Global session manager instance
-session_manager = SessionManager()
\ No newline at end of file
+session_manager = SessionManager(turn_writer=turn_writer)
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Background batch writer for conversation turns.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session as DBSession
+
+from app.database import crud
+from app.database.base import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# A batch is written this long after its first turn arrives, or sooner once full
+BATCH_SIZE = 100
+BATCH_WAIT = 0.05  # seconds
+
+
+class TurnWriter:
+    """
+    Queues conversation turns and inserts them in batches from a background task,
+    so chat responses do not wait on the INSERT and commit.
+    Readers see a turn shortly after its request returns (eventual consistency).
+    """
+
+    def __init__(self, session_factory: Callable[[], DBSession] = SessionLocal):
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the consumer task on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._consume())
+
+    async def stop(self):
+        """Stop the consumer once everything queued so far has been written."""
+        if not self.running:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    def enqueue(self, turn: Dict[str, Any]):
+        """Queue a turn (same fields as crud.create_conversation_turns_bulk)."""
+        self._queue.put_nowait(turn)
+
+    def add_listener(self, callback: Callable[[List[Dict[str, Any]]], None]):
+        """Call `callback(rows)` on the event loop after each batch has been written."""
+        self._listeners.append(callback)
+
+    async def _consume(self):
+        while True:
+            first = await self._queue.get()
+            if first is None:
+                return
+
+            # Give concurrent requests a moment to add to the batch
+            await asyncio.sleep(BATCH_WAIT)
+            rows = [first]
+            stopping = False
+            while len(rows) < BATCH_SIZE and not self._queue.empty():
+                turn = self._queue.get_nowait()
+                if turn is None:
+                    stopping = True
+                    break
+                rows.append(turn)
+
+            await self._write(rows)
+            if stopping:
+                return
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        try:
+            await asyncio.to_thread(self._flush, rows)
+        except Exception as e:
+            logger.error(f"Error writing {len(rows)} conversation turns: {str(e)}")
+
+        for callback in self._listeners:
+            try:
+                callback(rows)
+            except Exception as e:
+                logger.error(f"Error in turn writer listener: {str(e)}")
+
+    def _flush(self, rows: List[Dict[str, Any]]):
+        with self._session_factory() as db:
+            try:
+                crud.create_conversation_turns_bulk(db, rows)
+                return
+            except Exception as e:
+                db.rollback()
+                if len(rows) == 1:
+                    raise
+                logger.warning(f"Batch of {len(rows)} conversation turns failed, writing them one by one: {str(e)}")
+
+            # Isolate the failing turn(s) so the rest of the batch is still saved
+            for row in rows:
+                try:
+                    crud.create_conversation_turns_bulk(db, [row])
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Error writing conversation turn for session {row['session_id']}: {str(e)}")
+
+
+# Global instance
+turn_writer = TurnWriter()
@@ -1,10 +1,14 @@
 """
 Main application entry point for the Chatbot MVP.
 """
+import hashlib
 import logging
+import orjson
+from pathlib import Path
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 
@@ -12,6 +16,7 @@ from app.config import settings
 from app.api.chat import router as chat_router
 from app.api.health import router as health_router
 from app.api.models import ErrorResponse
+from app.state.turn_writer import turn_writer
 
 # Configure logging
 logging.basicConfig(
@@ -20,12 +25,57 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Static error bodies, serialized once at import
+_EMPTY_INPUT_BODY = orjson.dumps({
+    "error_code": "EMPTY_INPUT",
+    "message": "Please enter a message to continue our conversation.",
+    "details": {
+        "field": "user_text",
+        "issue": "Message cannot be empty"
+    }
+})
+_MESSAGE_TOO_LONG_BODY = orjson.dumps({
+    "error_code": "MESSAGE_TOO_LONG",
+    "message": "Your message is too long. Please keep it under 1000 characters.",
+    "details": {
+        "field": "user_text",
+        "max_length": 1000
+    }
+})
+_INTERNAL_ERROR_BODY = orjson.dumps(
+    ErrorResponse(
+        error_code="INTERNAL_ERROR",
+        message="An unexpected error occurred"
+    ).model_dump()
+)
+
+def _json_bytes_response(body: bytes, status_code: int) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+# Static file names are not content-hashed, so browsers cache them for an hour
+# and then revalidate with the ETag/Last-Modified that StaticFiles already sets
+STATIC_CACHE_CONTROL = "public, max-age=3600"
+
+# Chat page, read once at import; the ETag lets browsers revalidate with a 304
+_INDEX_HTML = Path('static/index.html').read_bytes()
+_INDEX_ETAG = '"' + hashlib.sha256(_INDEX_HTML).hexdigest()[:32] + '"'
+_INDEX_HEADERS = {"ETag": _INDEX_ETAG, "Cache-Control": "no-cache"}
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with a Cache-Control header on every file response."""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = STATIC_CACHE_CONTROL
+        return response
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.app_name,
     description="A simple chatbot MVP with extensible architecture",
     version="0.1.0",
-    debug=True  # 启用调试模式
+    debug=settings.debug,  # 调试模式（默认关闭）
+    default_response_class=ORJSONResponse  # 响应体使用orjson序列化
 )
 
 # Add CORS middleware
@@ -37,8 +87,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses (the chat page, long answers); small JSON is sent as-is
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
 # Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Custom validation error handler for user-friendly messages
 @app.exception_handler(RequestValidationError)
@@ -50,33 +103,13 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     for error in errors:
         if (error.get("loc") == ["body", "user_text"] and 
             error.get("type") == "string_too_short"):
-            return JSONResponse(
-                status_code=422,
-                content={
-                    "error_code": "EMPTY_INPUT",
-                    "message": "Please enter a message to continue our conversation.",
-                    "details": {
-                        "field": "user_text",
-                        "issue": "Message cannot be empty"
-                    }
-                }
-            )
+            return _json_bytes_response(_EMPTY_INPUT_BODY, 422)
         elif (error.get("loc") == ["body", "user_text"] and 
               error.get("type") == "string_too_long"):
-            return JSONResponse(
-                status_code=422,
-                content={
-                    "error_code": "MESSAGE_TOO_LONG",
-                    "message": "Your message is too long. Please keep it under 1000 characters.",
-                    "details": {
-                        "field": "user_text",
-                        "max_length": 1000
-                    }
-                }
-            )
+            return _json_bytes_response(_MESSAGE_TOO_LONG_BODY, 422)
     
     # 默认验证错误处理
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=422,
         content={
             "error_code": "INVALID_INPUT",
@@ -85,6 +118,16 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         }
     )
 
+@app.on_event("startup")
+async def start_turn_writer():
+    """启动对话轮次的后台批量写入"""
+    turn_writer.start()
+
+@app.on_event("shutdown")
+async def stop_turn_writer():
+    """关闭前写入队列中剩余的对话轮次"""
+    await turn_writer.stop()
+
 # Include routers with versioning
 app.include_router(
     health_router,
@@ -98,7 +141,7 @@ app.include_router(
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Custom HTTP exception handler."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content=exc.detail if isinstance(exc.detail, dict) else {
             "error_code": "HTTP_ERROR",
@@ -110,20 +153,15 @@ async def http_exception_handler(request, exc):
 async def general_exception_handler(request, exc):
     """General exception handler for unexpected errors."""
     logger.error(f"Unhandled exception: {str(exc)}")
-    return JSONResponse(
-        status_code=500,
-        content=ErrorResponse(
-            error_code="INTERNAL_ERROR",
-            message="An unexpected error occurred"
-        ).dict()
-    )
+    return _json_bytes_response(_INTERNAL_ERROR_BODY, 500)
 
 # Root endpoint to serve the chat interface
 @app.get("/")
-async def read_root():
-    """Redirect to the chat interface"""
-    from fastapi.responses import FileResponse
-    return FileResponse('static/index.html')
+async def read_root(request: Request):
+    """Serve the chat interface (always revalidated: the page changes on deploy without a new URL)"""
+    if request.headers.get("if-none-match") == _INDEX_ETAG:
+        return Response(status_code=304, headers=_INDEX_HEADERS)
+    return Response(content=_INDEX_HTML, media_type="text/html", headers=_INDEX_HEADERS)
 
 if __name__ == "__main__":
     import uvicorn
@@ -133,5 +171,8 @@ if __name__ == "__main__":
         host=settings.host,
         port=settings.port,
         reload=False,  # 禁用热重载
+        workers=settings.workers,
+        # loop/http默认为auto：已安装uvloop、httptools时自动使用
+        access_log=False,  # 请求日志由chat接口自行记录
         log_level="info"
     )
\ No newline at end of file
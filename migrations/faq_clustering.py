@@ -5,10 +5,12 @@ This script clusters FAQ questions using BERTopic and writes results to MySQL da
 
 Requirements:
     pip install bertopic pandas numpy sentence-transformers pymysql scikit-learn
+    pip install selectolax  # optional: fast HTML stripping (falls back to beautifulsoup4)
 """
 import os
 import re
 import json
+import hashlib
 import warnings
 import pandas as pd
 import numpy as np
@@ -17,10 +19,27 @@ import uuid
 
 from typing import List, Dict
 from bertopic import BERTopic
-from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import Pipeline, make_pipeline
 from sentence_transformers import SentenceTransformer
 import pymysql
-from bs4 import BeautifulSoup
+import torch
+
+# Optional: run UMAP/HDBSCAN on GPU when RAPIDS cuML is installed
+try:
+    from cuml.manifold import UMAP as cumlUMAP
+    from cuml.cluster import HDBSCAN as cumlHDBSCAN
+    CUML_AVAILABLE = True
+except ImportError:
+    CUML_AVAILABLE = False
+
+# Optional: C-based HTML parser for stripping markup (BeautifulSoup otherwise)
+try:
+    from selectolax.parser import HTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
 
 # Configuration
 CONFIG = {
@@ -28,9 +47,13 @@ CONFIG = {
     "input_file": "migrations/faq.json",
     "output_dir": "data/processed/bertopic",
     "model_dir": "artifacts/bertopic/model",
+    "embeddings_file": "artifacts/bertopic/embeddings.npy",
     
     # 模型配置
     "embedding_model": "sentence-transformers/all-MiniLM-L6-v2",
+    "encode_batch_size": 128, # 每次前向计算的文本数
+    "lightweight_embedder": False,  # True: 用Hashing+TF-IDF+SVD代替SentenceTransformer（小语料更快）
+    "svd_components": 100,    # 轻量嵌入的维度
     "nr_topics": 10,          # 期望的主题数量
     "random_state": 42,       # 随机种子
     
@@ -60,30 +83,50 @@ LOW_INFO_WORDS = [
     'have', 'has', 'had', 'having', 'get', 'getting', 'got', 'i', 'you', 'he', 'she',
     'it', 'we', 'they', 'my', 'your', 'his', 'her', 'its', 'our', 'their'
 ]
+_LOW_INFO = frozenset(LOW_INFO_WORDS)
+
+# Custom stop words to keep important business terms
+CUSTOM_STOP_WORDS = [
+    'a', 'an', 'the', 'this', 'that', 'these', 'those',
+    'and', 'but', 'or', 'nor', 'for', 'yet', 'so',
+    'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'
+]
+
+_WS_RE = re.compile(r'\s+')
 
 def setup_dirs() -> None:
     """Create necessary directories if they don't exist."""
     for path in [CONFIG['output_dir'], CONFIG['model_dir']]:
         os.makedirs(path, exist_ok=True)
 
-def preprocess_text(text: str) -> str:
-    """Clean and normalize text."""
-    if pd.isna(text):
-        return ""
-    
-    # Convert to string if not already
-    text = str(text)
-    
-    # Remove HTML if BeautifulSoup is available
+def strip_html(text: str) -> str:
+    """Remove HTML tags and entities, leaving the text unchanged on parse errors."""
+    if SELECTOLAX_AVAILABLE:
+        try:
+            return HTMLParser(text).text()
+        except Exception:
+            pass  # Retry with BeautifulSoup's more forgiving parser
+    
+    # Imported on first use: plain-text corpora never load bs4
+    from bs4 import BeautifulSoup
     try:
-        text = BeautifulSoup(text, "html.parser").get_text()
+        return BeautifulSoup(text, "html.parser").get_text()
     except:
-        pass
-    
-    # Convert to lowercase and normalize whitespace
-    text = re.sub(r'\s+', ' ', text.lower().strip())
-    
-    return text
+        return text
+
+def preprocess_text(texts: pd.Series) -> pd.Series:
+    """Clean and normalize a column of text."""
+    # Convert to string if not already (missing values become empty)
+    texts = texts.fillna("").astype(str)
+    
+    # Only rows that can contain markup or entities go through BeautifulSoup
+    has_html = texts.str.contains(r'[<&]', regex=True)
+    if has_html.any():
+        texts = texts.copy()
+        texts[has_html] = texts[has_html].map(strip_html)
+    
+    # Convert to lowercase and normalize whitespace (vectorized over the column)
+    return texts.str.lower().str.replace(_WS_RE, ' ', regex=True).str.strip()
 
 def load_and_preprocess_data() -> pd.DataFrame:
     """Load and preprocess the FAQ data from JSON file."""
@@ -103,7 +146,7 @@ def load_and_preprocess_data() -> pd.DataFrame:
     # Remove UUID generation - let MySQL handle it
     
     # Preprocess questions
-    df['question_clean'] = df['question'].apply(preprocess_text)
+    df['question_clean'] = preprocess_text(df['question'])
     
     # Remove duplicates
     df = df.drop_duplicates(subset=['question_clean'])
@@ -115,19 +158,66 @@ def load_and_preprocess_data() -> pd.DataFrame:
     
     return df
 
-def create_bertopic_model(data_size: int) -> BERTopic:
+def load_or_encode_embeddings(embedding_model: SentenceTransformer, texts: List[str]) -> np.ndarray:
+    """
+    Encode texts once and cache the result next to the model artifacts.
+    Re-runs on the same questions with the same model load the cached array
+    instead of re-encoding; the cache key is stored in a sidecar .json file.
+    """
+    embeddings_file = CONFIG['embeddings_file']
+    meta_file = os.path.splitext(embeddings_file)[0] + '.json'
+    key = {
+        "model": CONFIG['embedding_model'],
+        "texts_sha1": hashlib.sha1('\n'.join(texts).encode('utf-8')).hexdigest()
+    }
+    
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            if json.load(f) == key:
+                embeddings = np.load(embeddings_file)
+                if len(embeddings) == len(texts):
+                    print(f"Loaded cached embeddings from {embeddings_file}")
+                    return embeddings
+    except (OSError, ValueError):
+        pass
+    
+    print(f"Encoding {len(texts)} questions...")
+    with torch.inference_mode():
+        embeddings = embedding_model.encode(
+            texts,
+            batch_size=CONFIG['encode_batch_size'],
+            convert_to_numpy=True,
+            show_progress_bar=True
+        ).astype(np.float32, copy=False)
+    
+    os.makedirs(os.path.dirname(embeddings_file), exist_ok=True)
+    np.save(embeddings_file, embeddings)
+    with open(meta_file, 'w', encoding='utf-8') as f:
+        json.dump(key, f)
+    
+    return embeddings
+
+def create_lightweight_embedder(data_size: int) -> Pipeline:
+    """
+    Hashing -> TF-IDF -> SVD embedding pipeline.
+    Much faster than a transformer for small FAQ corpora and needs no GPU;
+    BERTopic accepts the fitted pipeline as its embedding model.
+    """
+    return make_pipeline(
+        HashingVectorizer(n_features=2**15),
+        TfidfTransformer(),
+        TruncatedSVD(
+            min(CONFIG['svd_components'], max(2, data_size - 1)),
+            random_state=CONFIG['random_state']
+        )
+    )
+
+def create_bertopic_model(data_size: int, embedding_model) -> BERTopic:
     """Initialize and configure BERTopic model."""
     # Configure CountVectorizer with dynamic parameters based on data size
     min_df = 1 if data_size < 100 else 2
     max_df = min(0.95, max(0.5, 1.0 - 10/data_size))  # Dynamic max_df
     
-    # Custom stop words to keep important business terms
-    custom_stop_words = [
-        'a', 'an', 'the', 'this', 'that', 'these', 'those',
-        'and', 'but', 'or', 'nor', 'for', 'yet', 'so',
-        'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'
-    ]
-    
     vectorizer = CountVectorizer(
         ngram_range=CONFIG['ngram_range'],  # 使用配置的词组长度范围
         stop_words='english',               # 使用英语停用词
@@ -135,15 +225,26 @@ def create_bertopic_model(data_size: int) -> BERTopic:
         max_df=max_df
     )
     
-    # Initialize embedding model
-    embedding_model = SentenceTransformer(CONFIG['embedding_model'])
+    min_topic_size = max(2, data_size // 20)  # Dynamic min topic size
+    
+    # GPU versions of BERTopic's default UMAP/HDBSCAN settings, if available
+    gpu_models = {}
+    if CUML_AVAILABLE:
+        print("Using cuML UMAP/HDBSCAN")
+        gpu_models = {
+            "umap_model": cumlUMAP(n_neighbors=15, n_components=5, min_dist=0.0, metric='cosine'),
+            "hdbscan_model": cumlHDBSCAN(
+                min_cluster_size=min_topic_size, metric='euclidean', prediction_data=True
+            )
+        }
     
     # Create BERTopic model with correct parameters
     topic_model = BERTopic(
         embedding_model=embedding_model,
         vectorizer_model=vectorizer,
         nr_topics=CONFIG['nr_topics'],
-        min_topic_size=max(2, data_size // 20)  # Dynamic min topic size
+        min_topic_size=min_topic_size,
+        **gpu_models
     )
     
     return topic_model
@@ -176,7 +277,7 @@ def generate_topic_name(topic_words: List[tuple]) -> str:
     words_with_scores = [(word, score) for word, score in topic_words[:CONFIG['top_n_words']]]
     
     # Filter out low information words but keep their scores for reference
-    filtered_words = [(w, s) for w, s in words_with_scores if w not in LOW_INFO_WORDS]
+    filtered_words = [(w, s) for w, s in words_with_scores if w not in _LOW_INFO]
     
     if not filtered_words:
         # If all words are low information, use original words
@@ -244,16 +345,23 @@ def insert_data_to_mysql(assignments_df: pd.DataFrame) -> None:
         VALUES (%s, %s, %s, %s)
         """
         
-        for _, row in assignments_df.iterrows():
-            # Generate UUID string (36 chars, with hyphens)
-            uuid_str = str(uuid.uuid4())
-            cursor.execute(insert_query, (
-                uuid_str,
-                row['topic_name'],
-                row['question'],
-                row.get('answer', 'No answer provided')  # Use default text if no answer
-            ))
+        # Use default text if no answer
+        if 'answer' in assignments_df.columns:
+            answers = assignments_df['answer']
+        else:
+            answers = ['No answer provided'] * len(assignments_df)
+        
+        # UUID string (36 chars, with hyphens) per row
+        rows = [
+            (str(uuid.uuid4()), topic_name, question, answer)
+            for topic_name, question, answer in zip(
+                assignments_df['topic_name'], assignments_df['question'], answers
+            )
+        ]
         
+        # pymysql rewrites executemany of INSERT ... VALUES into multi-row INSERTs,
+        # all committed in one transaction
+        cursor.executemany(insert_query, rows)
         conn.commit()
         print(f"Inserted {len(assignments_df)} rows in MySQL")
         
@@ -284,9 +392,20 @@ def main():
     df = load_and_preprocess_data()
     print(f"Loaded {len(df)} unique questions")
     
-    # Create and fit model
-    model = create_bertopic_model(len(df))
-    topics, probs = model.fit_transform(df['question_clean'])
+    questions = df['question_clean'].tolist()
+    if CONFIG['lightweight_embedder']:
+        embedding_model = create_lightweight_embedder(len(df))
+        embeddings = embedding_model.fit_transform(questions)
+    else:
+        # Compute (or load cached) embeddings once with a tuned batch size
+        embedding_model = SentenceTransformer(CONFIG['embedding_model'])
+        if torch.cuda.is_available():
+            embedding_model = embedding_model.half()  # FP16 inference on GPU
+        embeddings = load_or_encode_embeddings(embedding_model, questions)
+    
+    # Create and fit model on the precomputed embeddings
+    model = create_bertopic_model(len(df), embedding_model)
+    topics, probs = model.fit_transform(questions, embeddings=embeddings)
     
     # Get topic information
     topic_info = model.get_topic_info()
@@ -340,16 +459,21 @@ def main():
         print(f"Warning: Could not save model: {e}")
     
     # Print sample for manual validation (5 questions per topic)
+    # Shuffle once and keep the first 5 rows of each topic: one pass instead of a mask per topic
     print("\nSample questions per topic for manual validation:")
-    for topic_id in topics_df['topic_id']:
-        if topic_id == -1:  # Skip outliers
+    samples = (
+        assignments_df[assignments_df['topic_id'] != -1]  # Skip outliers
+        .sample(frac=1, random_state=CONFIG['random_state'])
+        .groupby('topic_id')
+        .head(5)
+    )
+    samples_by_topic = dict(tuple(samples.groupby('topic_id')))
+    for topic_id, topic_name in zip(topics_df['topic_id'], topics_df['topic_name']):
+        if topic_id not in samples_by_topic:
             continue
-        topic_questions = assignments_df[assignments_df['topic_id'] == topic_id]
-        topic_name = topics_df[topics_df['topic_id'] == topic_id]['topic_name'].iloc[0]
         print(f"\nTopic: {topic_name} (ID: {topic_id})")
-        sample_size = min(5, len(topic_questions))
-        for i, (_, row) in enumerate(topic_questions.sample(sample_size).iterrows()):
-            print(f"  {i+1}. {row['question']}")
+        for i, question in enumerate(samples_by_topic[topic_id]['question']):
+            print(f"  {i+1}. {question}")
     
     # Create MySQL table and insert data
     create_mysql_table()
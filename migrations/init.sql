@@ -8,14 +8,15 @@ CREATE TABLE IF NOT EXISTS sessions (
     session_id VARCHAR(36) PRIMARY KEY,
     status ENUM('active', 'expired', 'closed') NOT NULL DEFAULT 'active',
     session_data JSON,  -- 存储额外的会话元数据
+    turn_count INT NOT NULL DEFAULT 0,  -- 已记录的对话轮次数
     create_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_status (status),
+    INDEX idx_status_update_time (status, update_time),  -- 过期会话清理
     INDEX idx_create_time (create_time),
     INDEX idx_update_time (update_time)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
--- 对话轮次表
+-- 对话轮次表（大规模部署可再执行 partition_turns.sql 按 session_id 分区）
 CREATE TABLE IF NOT EXISTS conversation_turns (
     turn_id BIGINT AUTO_INCREMENT PRIMARY KEY,
     session_id VARCHAR(36) NOT NULL,
@@ -31,12 +32,21 @@ CREATE TABLE IF NOT EXISTS conversation_turns (
     create_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (session_id) REFERENCES sessions(session_id),
-    INDEX idx_session_turn (session_id, turn_number),
+    INDEX idx_session_turn (session_id, turn_number DESC),
     INDEX idx_intent (intent),
-    INDEX idx_create_time (create_time),
+    INDEX idx_ct_time_emotion_urgency (create_time, emotion, urgency, session_id),  -- 看板KPI/热力图/日趋势（覆盖索引）
+    INDEX idx_ct_time_intent (create_time, intent, emotion, urgency),  -- 看板Top意图（覆盖索引）
     INDEX idx_update_time (update_time)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- 对话轮次按小时汇总（看板热力图/日趋势读取，由看板服务每分钟刷新）
+CREATE TABLE IF NOT EXISTS conversation_turns_hourly (
+    bucket_start DATETIME PRIMARY KEY,  -- 小时起点
+    total_messages INT NOT NULL DEFAULT 0,
+    negative_messages INT NOT NULL DEFAULT 0,
+    update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- 意图统计表（用于分析）
 CREATE TABLE IF NOT EXISTS intent_analytics (
     id BIGINT AUTO_INCREMENT PRIMARY KEY,
@@ -47,7 +57,7 @@ CREATE TABLE IF NOT EXISTS intent_analytics (
     create_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_intent (intent),
-    INDEX idx_create_time (create_time)
+    INDEX idx_create_time_intent (create_time, intent)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- 会话统计表（用于分析）
@@ -72,5 +82,5 @@ CREATE TABLE IF NOT EXISTS user_feedback (
     update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (session_id) REFERENCES sessions(session_id),
     FOREIGN KEY (turn_id) REFERENCES conversation_turns(turn_id),
-    INDEX idx_session (session_id)
+    INDEX idx_session_time (session_id, create_time)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -1,4 +1,9 @@
+import hashlib
+import json
+import os
 import pymysql
+import numpy as np
+import torch
 from pymilvus import Collection, connections
 from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
@@ -19,12 +24,79 @@ MILVUS_PORT = "19530"
 MILVUS_DB = "q3demo"
 MILVUS_ALIAS = "q3"
 COLLECTION_NAME = "faq_qa"
-BATCH_SIZE = 100  # 每批处理的数据量
+BATCH_SIZE = 1024  # 每批从MySQL读取的数据量
+ENCODE_BATCH_SIZE = 128  # 模型每次前向计算的文本数
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# 本地embedding缓存：按faq_uuid复用上次迁移的向量，重复运行只编码新增/修改的问题
+EMBEDDINGS_CACHE = "artifacts/milvus/embeddings.f32"   # 连续float32矩阵，按行追加
+UUID_INDEX_FILE = "artifacts/milvus/uuid_index.json"    # {uuid: [行号, question的sha1]}
+
+class EmbeddingCache:
+    """faq_uuid -> embedding 的磁盘缓存（np.memmap只读映射已有行，新行追加到文件末尾）"""
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.index = {}
+        self.rows = None
+        self.new_rows = 0
+
+        try:
+            with open(UUID_INDEX_FILE, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = None
+
+        # 模型或维度变化时丢弃旧缓存
+        if meta and meta["model"] == MODEL_NAME and meta["dim"] == dim:
+            self.index = meta["index"]
+
+        os.makedirs(os.path.dirname(EMBEDDINGS_CACHE), exist_ok=True)
+        if self.index and os.path.exists(EMBEDDINGS_CACHE) and os.path.getsize(EMBEDDINGS_CACHE) > 0:
+            self.rows = np.memmap(EMBEDDINGS_CACHE, dtype=np.float32, mode='r')
+            self.rows = self.rows[:len(self.rows) // dim * dim].reshape(-1, dim)
+            self.size = len(self.rows)
+        else:
+            self.index = {}
+            open(EMBEDDINGS_CACHE, 'wb').close()
+            self.size = 0
+
+    @staticmethod
+    def _digest(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def lookup(self, uuids, questions):
+        """返回(embeddings, missing)：命中的行已填好，missing为需要重新编码的下标"""
+        embeddings = np.empty((len(uuids), self.dim), dtype=np.float32)
+        missing = []
+        for i, (uuid, question) in enumerate(zip(uuids, questions)):
+            entry = self.index.get(uuid)
+            if entry and entry[0] < self.size and entry[1] == self._digest(question):
+                embeddings[i] = self.rows[entry[0]]
+            else:
+                missing.append(i)
+        return embeddings, missing
+
+    def add(self, uuids, questions, embeddings):
+        """追加新编码的向量到缓存文件末尾并更新索引"""
+        with open(EMBEDDINGS_CACHE, 'ab') as f:
+            f.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+        start = self.size + self.new_rows
+        for offset, (uuid, question) in enumerate(zip(uuids, questions)):
+            self.index[uuid] = [start + offset, self._digest(question)]
+        self.new_rows += len(uuids)
+
+    def save(self):
+        """写入索引（先写临时文件再替换，避免中断时留下半个文件）"""
+        tmp_file = UUID_INDEX_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"model": MODEL_NAME, "dim": self.dim, "index": self.index}, f)
+        os.replace(tmp_file, UUID_INDEX_FILE)
 
 def init_connections():
     """初始化MySQL和Milvus连接"""
-    # 连接MySQL
-    mysql_conn = pymysql.connect(**MYSQL_CONFIG)
+    # 连接MySQL（无缓冲游标，结果集按批流式读取，客户端内存不随表大小增长）
+    mysql_conn = pymysql.connect(**MYSQL_CONFIG, cursorclass=pymysql.cursors.SSCursor)
     
     # 连接Milvus
     connections.connect(
@@ -43,64 +115,86 @@ def get_total_records(cursor):
     cursor.execute("SELECT COUNT(*) FROM faq_qa")
     return cursor.fetchone()[0]
 
+def load_model():
+    """加载sentence transformer模型，GPU上使用FP16推理"""
+    model = SentenceTransformer(MODEL_NAME)
+    if torch.cuda.is_available():
+        model = model.half()
+    return model
+
 def batch_generate_embeddings(model, texts):
-    """批量生成文本嵌入向量"""
-    return model.encode(texts, show_progress_bar=False)
+    """批量生成文本嵌入向量（L2归一化的float32 numpy数组，集合使用IP度量依赖于此）"""
+    with torch.inference_mode():
+        embeddings = model.encode(
+            texts,
+            batch_size=ENCODE_BATCH_SIZE,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+    # 本地缓存统一存float32（GPU上FP16输出需转换），写入Milvus时再转为float16
+    return embeddings.astype(np.float32, copy=False)
 
 def main():
     # 初始化sentence transformer模型
     print("Loading sentence transformer model...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    model = load_model()
     
     # 建立连接
     print("Connecting to databases...")
     mysql_conn, collection = init_connections()
     cursor = mysql_conn.cursor()
+    cache = EmbeddingCache(model.get_sentence_embedding_dimension())
     
     try:
         # 获取总记录数用于进度显示
         total_records = get_total_records(cursor)
         print(f"Total records to migrate: {total_records}")
         
-        # 分批读取MySQL数据
-        offset = 0
+        # 一次查询，流式分批读取MySQL数据（无OFFSET，也无需逐页重新查询）
+        migrated = 0
+        cursor.execute("""
+            SELECT uuid, category, question, answer 
+            FROM faq_qa 
+            ORDER BY id
+        """)
         with tqdm(total=total_records, desc="Migrating data") as pbar:
             while True:
                 # 读取一批数据
-                cursor.execute("""
-                    SELECT uuid, category, question, answer 
-                    FROM faq_qa 
-                    LIMIT %s OFFSET %s
-                """, (BATCH_SIZE, offset))
-                
-                records = cursor.fetchall()
+                records = cursor.fetchmany(BATCH_SIZE)
                 if not records:
                     break
                 
-                # 准备数据
-                questions = [record[2] for record in records]  # 使用question生成embedding
-                embeddings = batch_generate_embeddings(model, questions)
+                # 准备数据：缓存命中的直接复用，只对新增/修改的question生成embedding
+                uuids = [str(record[0]) for record in records]
+                questions = [str(record[2]) for record in records]
+                embeddings, missing = cache.lookup(uuids, questions)
+                if missing:
+                    missing_uuids = [uuids[i] for i in missing]
+                    missing_questions = [questions[i] for i in missing]
+                    encoded = batch_generate_embeddings(model, missing_questions)
+                    embeddings[missing] = encoded
+                    cache.add(missing_uuids, missing_questions, encoded)
                 
-                # 逐条插入Milvus
-                for i, record in enumerate(records):
-                    entities = {
-                        "faq_uuid": str(record[0]),    # 确保UUID是字符串
-                        "category": str(record[1]),    # 确保category是字符串
-                        "question": str(record[2]),    # 确保question是字符串
-                        "answer": str(record[3]),      # 确保answer是字符串
-                        "embedding": embeddings[i].tolist()  # 对应的embedding
-                    }
-                    # 插入单条数据
-                    collection.insert(entities)
+                # 按列整批插入Milvus，每页一次RPC（列顺序与milvus.py中schema一致，id自动生成）
+                collection.insert([
+                    uuids,                                   # faq_uuid，确保是字符串
+                    [str(record[1]) for record in records],  # category
+                    questions,                               # question
+                    [str(record[3]) for record in records],  # answer
+                    ["faq"] * len(records),                  # kind
+                    list(embeddings.astype(np.float16))      # embedding（FLOAT16_VECTOR）
+                ])
                 
                 # 更新进度
-                offset += len(records)
+                migrated += len(records)
                 pbar.update(len(records))
         
         # 创建索引（如果还没创建）
         print("Creating index if not exists...")
         collection.flush()  # 确保数据持久化
-        print(f"Successfully migrated {offset} records to Milvus!")
+        cache.save()
+        print(f"Successfully migrated {migrated} records to Milvus!")
         
     finally:
         # 清理连接
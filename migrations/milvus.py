@@ -10,7 +10,7 @@ EMBED_DIM = 384             # 文本向量维度（按你的嵌入模型来）
 
 INDEX_PARAMS = {
     "index_type": "HNSW",
-    "metric_type": "COSINE",          # 若未做归一化可改为 "L2"
+    "metric_type": "IP",              # 所有写入/查询向量均已L2归一化，内积即余弦相似度（省去每次距离计算的归一化）
     "params": {"M": 16, "efConstruction": 200}
 }
 
@@ -18,6 +18,7 @@ INDEX_PARAMS = {
 connections.connect(alias=USING, host=HOST, port=PORT, db_name=DB_NAME)
 
 # 2) 在 q3demo 中建集合（等同“建表”）
+#    已有的FLOAT_VECTOR集合不会被修改：需先删除集合，再运行本脚本和 migrate_to_milvus.py 重新导入
 if not utility.has_collection(COLLECTION, using=USING):
     fields = [
         FieldSchema(name="id",        dtype=DataType.INT64,  is_primary=True, auto_id=True),
@@ -25,14 +26,19 @@ if not utility.has_collection(COLLECTION, using=USING):
         FieldSchema(name="category",  dtype=DataType.VARCHAR, max_length=64),     # 业务分类
         FieldSchema(name="question",  dtype=DataType.VARCHAR, max_length=1024),   # 标准问
         FieldSchema(name="answer",    dtype=DataType.VARCHAR, max_length=16384),  # 答案内容
-        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=EMBED_DIM)
+        FieldSchema(name="kind",      dtype=DataType.VARCHAR, max_length=16,      # 'faq' 或 'casual'（日常对话pattern）
+                    is_partition_key=True),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT16_VECTOR, dim=EMBED_DIM)  # 半精度，内存与索引大小减半（需Milvus 2.4+）
     ]
     schema = CollectionSchema(fields, description="FAQ semantic index")
     col = Collection(name=COLLECTION, schema=schema, shards_num=2, using=USING)
 else:
     col = Collection(name=COLLECTION, using=USING)
 
-# 3) 为向量字段建索引并加载
+# 3) 为向量字段建索引并加载（旧索引度量类型不同时先删除重建，例如原COSINE索引）
+if col.has_index() and col.index().params.get("metric_type") != INDEX_PARAMS["metric_type"]:
+    col.release()
+    col.drop_index()
 col.create_index(field_name="embedding", index_params=INDEX_PARAMS)
 col.load()
 print(f"[OK] Collection `{DB_NAME}.{COLLECTION}` is ready.")
@@ -0,0 +1,20 @@
+-- 可选：大规模部署时将 conversation_turns 按 session_id 做 KEY 分区（16个分区）
+-- 按会话读取（WHERE session_id = ?）只访问一个分区，写入分散到各分区的B树。
+-- 注意：InnoDB 分区表不支持外键，且主键必须包含分区列，
+-- 因此这里去掉 conversation_turns 相关的外键，由应用保证一致性。
+-- 执行前请备份；大表会整表重建，建议在低峰期执行。
+
+USE q3demo;
+
+-- 去掉外键（init.sql 未命名外键，以下为 InnoDB 自动生成的名称）
+ALTER TABLE user_feedback DROP FOREIGN KEY user_feedback_ibfk_2;           -- turn_id -> conversation_turns
+ALTER TABLE conversation_turns DROP FOREIGN KEY conversation_turns_ibfk_1;  -- session_id -> sessions
+
+-- 主键加入分区列，turn_id 仍为自增且全局唯一
+ALTER TABLE conversation_turns
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (turn_id, session_id);
+
+-- 按 session_id 哈希分区，idx_session_turn 等索引随之在每个分区内各自维护
+ALTER TABLE conversation_turns
+    PARTITION BY KEY (session_id) PARTITIONS 16;
\ No newline at end of file
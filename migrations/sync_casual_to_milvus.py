@@ -0,0 +1,72 @@
+"""
+将 app/data/chat_patterns.json 中的casual patterns同步到Milvus（kind='casual'）
+
+开启 SEMANTIC_FUSED_CASUAL 后，意图分类与FAQ检索合并为一次ANN查询。
+修改patterns文件后重新运行即可：先删除旧的casual数据再整批插入。
+使用应用的模型单例生成向量，保证与查询向量的后端（torch/onnx）一致。
+
+运行（在项目根目录）：
+    python -m migrations.sync_casual_to_milvus
+"""
+import json
+import numpy as np
+from pymilvus import Collection, connections
+
+from app.nlp.model_singleton import model
+
+# Milvus配置（与milvus.py保持一致）
+MILVUS_HOST = "127.0.0.1"
+MILVUS_PORT = "19530"
+MILVUS_DB = "q3demo"
+MILVUS_ALIAS = "q3"
+COLLECTION_NAME = "faq_qa"
+PATTERNS_FILE = "app/data/chat_patterns.json"
+
+def load_casual_patterns():
+    """按category展开casual patterns，返回(categories, texts)两个等长列表"""
+    with open(PATTERNS_FILE, 'r', encoding='utf-8') as f:
+        patterns = json.load(f)['casual_patterns']
+
+    categories, texts = [], []
+    for category, pats in patterns.items():
+        categories.extend([category] * len(pats))
+        texts.extend(pats)
+    return categories, texts
+
+def main():
+    categories, texts = load_casual_patterns()
+    print(f"Encoding {len(texts)} casual patterns...")
+    embeddings = model.encode_texts(texts)
+
+    connections.connect(
+        alias=MILVUS_ALIAS,
+        host=MILVUS_HOST,
+        port=MILVUS_PORT,
+        db_name=MILVUS_DB
+    )
+    try:
+        collection = Collection(name=COLLECTION_NAME, using=MILVUS_ALIAS)
+
+        # 删除旧的casual数据，保证重复运行结果一致
+        collection.delete('kind == "casual"')
+
+        # casual pattern复用FAQ字段：category存类别，question存pattern原文
+        collection.insert([
+            {
+                "faq_uuid": "",
+                "category": category,
+                "question": text,
+                "answer": "",
+                "kind": "casual",
+                "embedding": embedding.astype(np.float16)  # 与集合的FLOAT16_VECTOR字段一致
+            }
+            for category, text, embedding in zip(categories, texts, embeddings)
+        ])
+        collection.flush()
+        print(f"Successfully synced {len(texts)} casual patterns to Milvus!")
+
+    finally:
+        connections.disconnect(MILVUS_ALIAS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+-- 已有数据库的增量升级脚本（新库直接使用 init.sql 即可）
+
+USE q3demo;
+
+-- 会话轮次计数器：替代每轮 COUNT(*) 计算 turn_number
+ALTER TABLE sessions ADD COLUMN turn_count INT NOT NULL DEFAULT 0 AFTER session_data;
+UPDATE sessions s
+SET turn_count = (SELECT COUNT(*) FROM conversation_turns t WHERE t.session_id = s.session_id);
+
+-- 最近轮次查询（ORDER BY turn_number DESC LIMIT n）走降序索引
+ALTER TABLE conversation_turns
+    DROP INDEX idx_session_turn,
+    ADD INDEX idx_session_turn (session_id, turn_number DESC);
+
+-- 会话反馈时间线
+ALTER TABLE user_feedback
+    DROP INDEX idx_session,
+    ADD INDEX idx_session_time (session_id, create_time);
+
+-- 意图统计按日期范围 + 意图聚合
+ALTER TABLE intent_analytics
+    DROP INDEX idx_create_time,
+    ADD INDEX idx_create_time_intent (create_time, intent);
+
+-- 过期会话清理（status = 'active' AND update_time < ?）
+ALTER TABLE sessions
+    DROP INDEX idx_status,
+    ADD INDEX idx_status_update_time (status, update_time);
+
+-- 看板按时间范围聚合走覆盖索引（idx_create_time 为其前缀，删除）
+ALTER TABLE conversation_turns
+    DROP INDEX idx_create_time,
+    ADD INDEX idx_ct_time_emotion_urgency (create_time, emotion, urgency, session_id),
+    ADD INDEX idx_ct_time_intent (create_time, intent, emotion, urgency);
+
+-- 对话轮次按小时汇总（看板热力图/日趋势读取，由看板服务每分钟刷新）
+CREATE TABLE IF NOT EXISTS conversation_turns_hourly (
+    bucket_start DATETIME PRIMARY KEY,  -- 小时起点
+    total_messages INT NOT NULL DEFAULT 0,
+    negative_messages INT NOT NULL DEFAULT 0,
+    update_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -0,0 +1,24 @@
+"""
+Shared fixtures.
+"""
+import pytest
+
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    One TestClient for the whole run: the app starts up (lifespan) once and
+    every request reuses the same event loop.
+    """
+    from fastapi.testclient import TestClient
+    from main import app
+    from app.state.session_manager import session_manager
+
+    # Write turns synchronously so a test reads back what it just posted
+    turn_writer = session_manager._turn_writer
+    session_manager._turn_writer = None
+    try:
+        with TestClient(app) as c:
+            yield c
+    finally:
+        session_manager._turn_writer = turn_writer
@@ -0,0 +1,93 @@
+"""
+Rule-based analyzer tests for emotion and urgency detection.
+"""
+import pytest
+from analyzers import EmotionAnalyzer, UrgencyAnalyzer, UnifiedAnalyzer
+
+
+class TestEmotionAnalyzer:
+    """Test emotion keyword matching."""
+
+    def test_negative_takes_priority(self):
+        analyzer = EmotionAnalyzer()
+
+        assert analyzer.analyze_emotion("This is bad") == "negative"
+        assert analyzer.analyze_emotion("Great service, but the app is useless!") == "negative"
+
+    def test_positive(self):
+        analyzer = EmotionAnalyzer()
+
+        assert analyzer.analyze_emotion("Thanks, that was perfect.") == "positive"
+
+    def test_neutral(self):
+        analyzer = EmotionAnalyzer()
+
+        assert analyzer.analyze_emotion("How do I reset my password?") == "neutral"
+        assert analyzer.analyze_emotion("") == "neutral"
+
+    def test_whole_word_matching(self):
+        analyzer = EmotionAnalyzer()
+
+        # "bad" must not match inside "badge", nor "good" inside "goodbye"
+        assert analyzer.analyze_emotion("Where is my badge? goodbye") == "neutral"
+
+
+class TestUrgencyAnalyzer:
+    """Test urgency phrase matching."""
+
+    def test_high_takes_priority(self):
+        analyzer = UrgencyAnalyzer()
+
+        assert analyzer.analyze_urgency("Maybe fix it, but it's urgent!") == "high"
+        assert analyzer.analyze_urgency("I need this right now") == "high"
+
+    def test_medium(self):
+        analyzer = UrgencyAnalyzer()
+
+        assert analyzer.analyze_urgency("This is important, please reply soon") == "medium"
+
+    def test_default_low(self):
+        analyzer = UrgencyAnalyzer()
+
+        assert analyzer.analyze_urgency("hello there") == "low"
+
+    def test_substring_matching(self):
+        analyzer = UrgencyAnalyzer()
+
+        # Urgency phrases match as substrings of the cleaned text
+        assert analyzer.analyze_urgency("Please respond urgently") == "high"
+
+    def test_phrases_match_across_whitespace(self):
+        analyzer = UrgencyAnalyzer()
+
+        assert analyzer.analyze_urgency("I need this right\nnow") == "high"
+        assert analyzer.analyze_urgency("I need this right  now") == "high"
+
+
+class TestUnifiedAnalyzer:
+    """Test single-pass emotion and urgency analysis."""
+
+    def test_matches_individual_analyzers(self):
+        analyzer = UnifiedAnalyzer()
+        emotion_analyzer = EmotionAnalyzer()
+        urgency_analyzer = UrgencyAnalyzer()
+
+        samples = [
+            "This is bad and I need it right now!",
+            "Thanks, that was great. Maybe later?",
+            "Where is my badge? It's important.",
+            "How do I reset my password",
+            "I need this right\nnow",
+            "Great  service,\tbut  right \n now it is broken",
+            "",
+        ]
+        for text in samples:
+            assert analyzer.analyze(text) == (
+                emotion_analyzer.analyze_emotion(text),
+                urgency_analyzer.analyze_urgency(text),
+            )
+
+    def test_priorities(self):
+        analyzer = UnifiedAnalyzer()
+
+        assert analyzer.analyze("Great, but the result is wrong. Urgent, please reply soon") == ("negative", "high")
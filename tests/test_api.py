@@ -2,16 +2,12 @@
 API endpoint tests for the chatbot MVP.
 """
 import pytest
-from fastapi.testclient import TestClient
-from main import app
-
-client = TestClient(app)
 
 
 class TestHealthEndpoint:
     """Test health check endpoints."""
     
-    def test_health_check(self):
+    def test_health_check(self, client):
         """Test basic health check endpoint."""
         response = client.get("/health")
         assert response.status_code == 200
@@ -21,7 +17,7 @@ class TestHealthEndpoint:
         assert "timestamp" in data
         assert "version" in data
     
-    def test_system_status(self):
+    def test_system_status(self, client):
         """Test detailed system status endpoint."""
         response = client.get("/status")
         assert response.status_code == 200
@@ -35,7 +31,7 @@ class TestHealthEndpoint:
 class TestChatEndpoint:
     """Test chat conversation endpoints."""
     
-    def test_chat_greeting(self):
+    def test_chat_greeting(self, client):
         """Test greeting intent recognition."""
         response = client.post("/api/v1/chat", json={
             "user_text": "hello"
@@ -50,7 +46,7 @@ class TestChatEndpoint:
         assert isinstance(data["confidence"], float)
         assert data["confidence"] > 0
     
-    def test_chat_faq_hours(self):
+    def test_chat_faq_hours(self, client):
         """Test FAQ hours intent recognition."""
         response = client.post("/api/v1/chat", json={
             "user_text": "what are your business hours"
@@ -62,7 +58,7 @@ class TestChatEndpoint:
         assert data["intent"] == "faq_hours"
         assert "9 AM to 6 PM" in data["reply_text"]
     
-    def test_chat_faq_price(self):
+    def test_chat_faq_price(self, client):
         """Test FAQ price intent recognition."""
         response = client.post("/api/v1/chat", json={
             "user_text": "how much does it cost"
@@ -74,7 +70,7 @@ class TestChatEndpoint:
         assert data["intent"] == "faq_price"
         assert "pricing" in data["reply_text"].lower()
     
-    def test_chat_fallback(self):
+    def test_chat_fallback(self, client):
         """Test fallback intent for unrecognized input."""
         response = client.post("/api/v1/chat", json={
             "user_text": "xyz random nonsense text"
@@ -86,7 +82,7 @@ class TestChatEndpoint:
         assert data["intent"] == "fallback"
         assert "sorry" in data["reply_text"].lower() or "understand" in data["reply_text"].lower()
     
-    def test_chat_session_continuity(self):
+    def test_chat_session_continuity(self, client):
         """Test session continuity across multiple messages."""
         # First message
         response1 = client.post("/api/v1/chat", json={
@@ -103,7 +99,7 @@ class TestChatEndpoint:
         assert response2.status_code == 200
         assert response2.json()["session_id"] == session_id
     
-    def test_chat_invalid_input(self):
+    def test_chat_invalid_input(self, client):
         """Test error handling for invalid input."""
         response = client.post("/api/v1/chat", json={
             "user_text": ""  # Empty text should fail validation
@@ -111,7 +107,7 @@ class TestChatEndpoint:
         
         assert response.status_code == 422  # Validation error
     
-    def test_session_stats(self):
+    def test_session_stats(self, client):
         """Test session statistics endpoint."""
         # Create a session with some conversation
         chat_response = client.post("/api/v1/chat", json={
@@ -0,0 +1,196 @@
+"""
+Database CRUD tests (run against an in-memory SQLite database).
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import sessionmaker
+
+from app.database import crud, models
+from app.database.base import Base
+from tests.utils import count_queries
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+class TestSessionTurns:
+    """Test conversation turn queries."""
+
+    def _seed(self, db, turns=5):
+        db.add(models.Session(session_id="s1", status="active"))
+        for i in range(1, turns + 1):
+            db.add(models.ConversationTurn(
+                turn_id=i, session_id="s1", user_input=f"q{i}", intent="faq",
+                confidence=0.9, bot_response=f"a{i}", turn_number=i
+            ))
+            db.add(models.UserFeedback(feedback_id=i, session_id="s1", turn_id=i, feedback_type="helpful"))
+        db.commit()
+        db.expunge_all()
+
+    def test_turns_newest_first(self, db):
+        self._seed(db)
+
+        turns = crud.get_session_turns(db, "s1", limit=3)
+        assert [t.turn_number for t in turns] == [5, 4, 3]
+
+    def test_keyset_pagination(self, db):
+        self._seed(db)
+
+        page = crud.get_session_turns(db, "s1", limit=2, before_turn=4)
+        assert [t.turn_number for t in page] == [3, 2]
+        page = crud.get_session_turns(db, "s1", limit=2, before_turn=page[-1].turn_number)
+        assert [t.turn_number for t in page] == [1]
+
+    def test_feedback_loaded_without_n_plus_one(self, db):
+        self._seed(db, turns=10)
+        statements = count_queries(db.get_bind())
+
+        turns = crud.get_session_turns(db, "s1", with_feedback=True)
+        assert all(len(t.feedback) == 1 for t in turns)
+        assert len(statements) <= 2
+
+    def test_session_with_turns_in_one_query(self, db):
+        self._seed(db)
+        statements = count_queries(db.get_bind())
+
+        session, turns = crud.get_session_with_turns(db, "s1", limit=3)
+        assert session.session_id == "s1"
+        assert [t.turn_number for t in turns] == [5, 4, 3]
+        assert len(statements) == 1
+
+    def test_session_with_turns_without_turns(self, db):
+        crud.create_session(db, "s2")
+
+        session, turns = crud.get_session_with_turns(db, "s2", limit=3)
+        assert session.session_id == "s2"
+        assert turns == []
+        assert crud.get_session_with_turns(db, "missing") == (None, [])
+
+
+class TestTurnNumbers:
+    """Test turn-number reservation and bulk numbering."""
+
+    def test_reserve_uses_last_insert_id_and_app_clock(self):
+        executed = []
+
+        def execute(stmt, execution_options=None):
+            executed.append(stmt)
+            return SimpleNamespace(lastrowid=7)
+
+        now = datetime(2024, 1, 1, 12, 0)
+        assert crud._reserve_turn_numbers(SimpleNamespace(execute=execute), "s1", now, count=3) == 7
+
+        compiled = executed[0].compile(dialect=mysql.dialect())
+        sql = str(compiled).lower()
+        assert "last_insert_id(sessions.turn_count +" in sql
+        assert "now()" not in sql
+        assert compiled.params["update_time"] == now
+
+    def test_bulk_numbers_each_session_in_order(self, monkeypatch):
+        counters = {"a": 2, "b": 0}
+        reserved = []
+
+        def reserve(db, session_id, now, count=1):
+            reserved.append(session_id)
+            counters[session_id] += count
+            return counters[session_id]
+
+        inserted = []
+        db = SimpleNamespace(execute=lambda stmt, rows: inserted.extend(rows), commit=lambda: None)
+        monkeypatch.setattr(crud, "_reserve_turn_numbers", reserve)
+        turns = [
+            {"session_id": session_id, "user_input": f"q{i}", "intent": "faq",
+             "confidence": 0.9, "bot_response": "a"}
+            for i, session_id in enumerate(["b", "a", "b", "a", "b"])
+        ]
+        assert crud.create_conversation_turns_bulk(db, turns) == 5
+
+        assert [(r["session_id"], r["user_input"], r["turn_number"]) for r in inserted] == [
+            ("b", "q0", 1), ("a", "q1", 3), ("b", "q2", 2), ("a", "q3", 4), ("b", "q4", 3)
+        ]
+        assert reserved == ["a", "b"]  # sessions locked in sorted order
+
+
+class TestIntentAnalytics:
+    """Test intent analytics aggregation."""
+
+    def test_aggregated_per_intent(self, db):
+        for i, (intent, occurrences, confidence, success_rate) in enumerate(
+                [("faq", 10, 0.8, 1.0), ("faq", 30, 0.6, 0.5), ("casual", 5, 0.9, 0.5)], start=1):
+            db.add(models.IntentAnalytics(
+                id=i, intent=intent, total_occurrences=occurrences,
+                avg_confidence=confidence, success_rate=success_rate, create_time=datetime(2024, 1, i)
+            ))
+        db.commit()
+
+        rows = {row.intent: row for row in crud.get_intent_analytics(db, start_date=datetime(2024, 1, 1))}
+        assert rows["faq"].total_occurrences == 40
+        # Weighted by occurrences: (10*0.8 + 30*0.6) / 40
+        assert rows["faq"].avg_confidence == pytest.approx(0.65)
+        assert rows["faq"].success_rate == pytest.approx(0.625)
+        assert rows["casual"].total_occurrences == 5
+
+
+class TestGetSession:
+    """Test session lookups."""
+
+    def test_repeat_lookup_uses_identity_map(self, db):
+        crud.create_session(db, "s1")
+        first = crud.get_session(db, "s1")  # identity map only holds referenced objects
+        statements = count_queries(db.get_bind())
+
+        assert crud.get_session(db, "s1") is first
+        assert statements == []
+
+    def test_lookup_after_commit_sees_writes(self, db):
+        crud.create_session(db, "s1")
+        crud.close_session(db, "s1")
+
+        assert crud.get_session(db, "s1").status == "closed"
+        assert crud.get_session(db, "missing") is None
+
+
+class TestSessionUpdates:
+    """Test single-statement session updates."""
+
+    def test_updates_report_missing_sessions(self, db):
+        crud.create_session(db, "s1")
+
+        assert crud.update_session_activity(db, "s1") is True
+        assert crud.update_session_data(db, "s1", {"transfer_requested": True}) is True
+        assert crud.get_session(db, "s1").session_data == {"transfer_requested": True}
+        assert crud.update_session_activity(db, "missing") is False
+        assert crud.close_session(db, "missing") is False
+
+    def test_activity_uses_app_clock(self, db):
+        db.add(models.Session(session_id="s1", status="active",
+                              create_time=datetime(2024, 1, 1), update_time=datetime(2024, 1, 1)))
+        db.commit()
+
+        before = datetime.now()
+        crud.update_session_activity(db, "s1")
+        assert before <= crud.get_session(db, "s1").update_time <= datetime.now()
+
+    def test_expire_sessions(self, db):
+        old = datetime(2024, 1, 1)
+        db.add(models.Session(session_id="stale", status="active", create_time=old, update_time=old))
+        db.add(models.Session(session_id="closed", status="closed", create_time=old, update_time=old))
+        crud.create_session(db, "fresh")
+
+        assert crud.expire_sessions(db, datetime(2024, 6, 1)) == 1
+        assert crud.get_session(db, "stale").status == "expired"
+        assert crud.get_session(db, "closed").status == "closed"
+        assert crud.get_session(db, "fresh").status == "active"
@@ -0,0 +1,180 @@
+"""
+Session manager tests (run against an in-memory SQLite database).
+"""
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import crud, models
+from app.database.base import Base
+from app.state.session_manager import (
+    ConversationTurn, InMemorySessionCacheStrategy, SessionCacheStrategy, SessionManager, SessionState
+)
+from app.state.turn_writer import TurnWriter
+from tests.utils import count_queries
+
+
+@pytest.fixture
+def manager():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    manager = SessionManager(
+        cache=InMemorySessionCacheStrategy(ttl=60),
+        session_factory=sessionmaker(bind=engine)
+    )
+    try:
+        yield manager
+    finally:
+        engine.dispose()
+
+
+class TestInMemorySessionCache:
+    """Test the TTL dict cache."""
+
+    def test_entries_expire(self):
+        cache = InMemorySessionCacheStrategy(ttl=0.05)
+        state = SessionState("s1", datetime.now(), datetime.now())
+
+        cache.set("s1", state)
+        assert cache.get("s1") is state
+
+        time.sleep(0.06)
+        assert cache.get("s1") is None
+
+    def test_delete(self):
+        cache = InMemorySessionCacheStrategy(ttl=60)
+        cache.set("s1", SessionState("s1", datetime.now(), datetime.now()))
+
+        cache.delete("s1")
+        cache.delete("missing")
+        assert cache.get("s1") is None
+
+    def test_size_is_capped(self):
+        cache = InMemorySessionCacheStrategy(ttl=60, max_entries=2)
+        for session_id in ("s1", "s2", "s3"):
+            cache.set(session_id, SessionState(session_id, datetime.now(), datetime.now()))
+
+        assert cache.get("s1") is None
+        assert cache.get("s3") is not None
+
+    def test_strategy_is_abstract(self):
+        with pytest.raises(TypeError):
+            SessionCacheStrategy()
+
+
+class TestSessionState:
+    """Test in-place turn recording."""
+
+    def test_add_recent_turn_trims_oldest(self):
+        state = SessionState("s1", datetime.now(), datetime.now())
+        for i, intent in enumerate(["a", "b", "c"]):
+            state.add_recent_turn(
+                ConversationTurn(datetime.now(), f"q{i}", intent, 0.1 * (i + 1), "r"), max_turns=2
+            )
+
+        assert [t.user_input for t in state.turns] == ["q2", "q1"]
+        assert state.intents_used == {"b", "c"}
+        assert state.confidence_sum == pytest.approx(0.5)
+
+
+class TestSessionManagerCache:
+    """Test that get_session is fronted by the cache."""
+
+    def _seed(self, manager):
+        now = datetime.now()
+        with manager._session_factory() as db:
+            db.add(models.Session(
+                session_id="s1", status="active", create_time=now, update_time=now
+            ))
+            db.commit()
+
+    def test_repeat_get_session_skips_db(self, manager):
+        self._seed(manager)
+        first = manager.get_session("s1")
+
+        statements = count_queries(manager._session_factory.kw["bind"])
+        assert manager.get_session("s1") is first
+        assert statements == []
+
+    def test_next_turn_is_served_from_cache(self, manager, monkeypatch):
+        monkeypatch.setattr(crud, "create_conversation_turn", lambda db, **turn: None)
+        session_id = manager.create_session()
+
+        # First round loads the state; recording the turn updates it in place
+        manager.get_session(session_id)
+        manager.update_session(session_id, "q0", "intent0", 0.5, "a")
+
+        # Second round: same request sequence as the chat endpoint
+        manager.create_session(session_id)
+        statements = count_queries(manager._session_factory.kw["bind"])
+        state = manager.get_session(session_id)
+        assert statements == []
+        manager.update_session(session_id, "q1", "intent1", 0.7, "a")
+
+        assert [t.user_input for t in state.turns] == ["q1", "q0"]
+        assert state.intents_used == {"intent0", "intent1"}
+        assert state.confidence_sum == pytest.approx(1.2)
+
+    def test_end_session_invalidates(self, manager):
+        self._seed(manager)
+        assert manager.get_session("s1") is not None
+
+        assert manager.end_session("s1")
+        assert manager.get_session("s1") is None
+
+
+class TestTurnWriter:
+    """Test background batching of conversation turns."""
+
+    def test_batches_and_drains_on_stop(self, monkeypatch):
+        batches = []
+        monkeypatch.setattr(crud, "create_conversation_turns_bulk", lambda db, rows: batches.append(rows))
+        writer = TurnWriter(session_factory=sessionmaker())
+
+        async def run():
+            writer.start()
+            for i in range(3):
+                writer.enqueue({"session_id": "s1", "user_input": f"q{i}"})
+            await asyncio.sleep(0)
+            await writer.stop()
+
+        asyncio.run(run())
+        assert [[row["user_input"] for row in rows] for rows in batches] == [["q0", "q1", "q2"]]
+        assert not writer.running
+
+    def test_failed_batch_falls_back_to_single_turns(self, monkeypatch):
+        written = []
+
+        def bulk(db, rows):
+            if len(rows) > 1 or rows[0]["user_input"] == "bad":
+                raise RuntimeError("insert failed")
+            written.append(rows[0]["user_input"])
+
+        monkeypatch.setattr(crud, "create_conversation_turns_bulk", bulk)
+        writer = TurnWriter(session_factory=sessionmaker())
+        writer._flush([{"session_id": "s1", "user_input": q} for q in ("q0", "bad", "q2")])
+        assert written == ["q0", "q2"]
+
+    def test_state_loaded_before_flush_is_dropped(self, manager, monkeypatch):
+        monkeypatch.setattr(crud, "create_conversation_turns_bulk", lambda db, rows: None)
+        writer = TurnWriter(session_factory=sessionmaker())
+        manager = SessionManager(
+            cache=InMemorySessionCacheStrategy(ttl=60),
+            session_factory=manager._session_factory,
+            turn_writer=writer
+        )
+        session_id = manager.create_session()
+
+        async def run():
+            writer.start()
+            manager.update_session(session_id, "q", "faq", 0.9, "a")
+            # Loaded from the DB while the turn is still queued
+            assert len(manager.get_session(session_id).turns) == 0
+            await writer.stop()
+
+        asyncio.run(run())
+        assert manager._cache.get(session_id) is None
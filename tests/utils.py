@@ -0,0 +1,12 @@
+"""
+Shared test helpers.
+"""
+from sqlalchemy import event
+
+
+def count_queries(engine):
+    """Attach a counter of executed statements to the engine."""
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements